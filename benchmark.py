@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+GTX Gaming 续期吞吐量基准测试
+
+启动本地模拟面板（mock_panel.py），以子进程方式针对不同服务器数量运行 main.py，
+记录总耗时、峰值内存（含浏览器子进程）以及每个服务器的处理耗时。
+
+用法:
+  python benchmark.py                              # 默认 1 / 10 / 100 / 500 个服务器
+  python benchmark.py --sizes 1 10 --engine browser --concurrency 4 --latency-ms 50
+  python benchmark.py --sizes 10 --engine browser --resource-blocking on   # 对比资源拦截开关
+  python benchmark.py --output benchmark_results.json
+"""
+
+# =====================================================================
+#                           导入依赖
+# =====================================================================
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from main import descendant_pids, percentile, read_rss
+from mock_panel import MOCK_REMEMBER_TOKEN, server_id_for, start_mock_panel
+
+# =====================================================================
+#                           基准测试
+# =====================================================================
+
+SCRIPT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'main.py')
+RSS_SAMPLE_INTERVAL = 0.1  # 进程树内存采样间隔（秒）
+
+
+def read_server_latencies(trace_path):
+    """从 main.py 输出的 JSONL 中读取每个服务器的处理耗时（毫秒）"""
+    latencies = []
+    if not os.path.exists(trace_path):
+        return latencies
+    with open(trace_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            record = json.loads(line)
+            if record.get('name') == 'server':
+                latencies.append(record['duration_ms'])
+    return latencies
+
+
+class TreeRSSSampler(threading.Thread):
+    """定期采样进程树（main.py 及 Playwright 驱动、浏览器等后代进程）的常驻内存总和"""
+
+    def __init__(self, pid, interval=RSS_SAMPLE_INTERVAL):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.peak = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            total = sum(read_rss(pid) for pid in [self.pid] + descendant_pids(self.pid))
+            self.peak = max(self.peak, total)
+            self._stop_event.wait(self.interval)
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+def run_once(base_url, size, args):
+    """运行一次 main.py，返回测量结果"""
+    with tempfile.TemporaryDirectory(prefix='gtx-bench-') as workdir:
+        trace_path = os.path.join(workdir, 'trace.jsonl')
+        servers = [{'url': f"{base_url}/server/{server_id_for(i)}", 'name': f"bench-{i}"} for i in range(size)]
+        env = dict(os.environ)
+        env.update({
+            'GTX_BASE_URL': base_url,
+            'REMEMBER_WEB_COOKIE': MOCK_REMEMBER_TOKEN,
+            'SERVER_LIST': json.dumps(servers),
+            'RENEW_ENGINE': args.engine,
+            'CONCURRENCY': str(args.concurrency),
+            'FORCE_RENEW': '1',
+            'SCREENSHOT_MODE': args.screenshot_mode,
+            'RESOURCE_BLOCKING': args.resource_blocking,
+            'TRACE_FILE': trace_path,
+            'SESSION_CACHE_FILE': os.path.join(workdir, 'session.json'),
+            'SERVER_STATE_FILE': os.path.join(workdir, 'server_state.json'),
+        })
+        env.pop('ACCOUNTS', None)
+        env.pop('ACCOUNTS_FILE', None)
+        env.pop('SERVER_LIST_FILE', None)
+
+        started = time.perf_counter()
+        process = subprocess.Popen([sys.executable, SCRIPT_PATH], cwd=workdir, env=env,
+                                   stdout=subprocess.DEVNULL if not args.verbose else None,
+                                   stderr=subprocess.STDOUT)
+        sampler = TreeRSSSampler(process.pid)
+        sampler.start()
+        # wait4 的 ru_maxrss 只是单个进程的峰值，进程树总和以采样结果为准
+        _, status, usage = os.wait4(process.pid, 0)
+        process.returncode = os.waitstatus_to_exitcode(status)
+        wall_time = time.perf_counter() - started
+        sampler.stop()
+        peak_rss = max(sampler.peak, usage.ru_maxrss * 1024)  # Linux 下 ru_maxrss 单位为 KB
+
+        latencies = read_server_latencies(trace_path)
+        return {
+            'servers': size,
+            'engine': args.engine,
+            'concurrency': args.concurrency,
+            'resource_blocking': args.resource_blocking,
+            'exit_code': process.returncode,
+            'wall_time_s': round(wall_time, 3),
+            'throughput_per_s': round(size / wall_time, 2) if wall_time else 0,
+            'peak_rss_mb': round(peak_rss / 1024 / 1024, 1),
+            'server_latency_ms': {
+                'count': len(latencies),
+                'p50': percentile(latencies, 0.5),
+                'p95': percentile(latencies, 0.95),
+                'max': max(latencies, default=0),
+            },
+        }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="GTX Gaming 续期吞吐量基准测试")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 10, 100, 500], help="服务器数量")
+    parser.add_argument('--engine', default='auto', choices=['auto', 'http', 'browser'])
+    parser.add_argument('--concurrency', type=int, default=1)
+    parser.add_argument('--screenshot-mode', default='off')
+    parser.add_argument('--resource-blocking', default='off', choices=['on', 'off'],
+                        help="浏览器资源拦截（启用路由会禁用 HTTP 缓存，需对比两种设置的耗时）")
+    parser.add_argument('--latency-ms', type=float, default=0, help="模拟面板每个请求的附加延迟")
+    parser.add_argument('--jitter-ms', type=float, default=0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--already-extended-rate', type=float, default=0.5)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="将结果写入 JSON 文件")
+    parser.add_argument('--verbose', action='store_true', help="显示 main.py 的输出")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    print(f"🧪 引擎: {args.engine}  并发: {args.concurrency}")
+
+    results = []
+    for size in args.sizes:
+        # 每个规模使用全新的模拟面板，避免上一轮续期过的服务器变成"今日已续期"
+        server, base_url = start_mock_panel(
+            server_count=size, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+            error_rate=args.error_rate, already_extended_rate=args.already_extended_rate, seed=args.seed)
+        try:
+            result = run_once(base_url, size, args)
+            results.append(result)
+            latency = result['server_latency_ms']
+            print(f"🖥️ {size:>4} 个服务器  耗时 {result['wall_time_s']:>8.2f}s  "
+                  f"吞吐 {result['throughput_per_s']:>7.2f}/s  峰值内存 {result['peak_rss_mb']:>7.1f}MB  "
+                  f"p50 {latency['p50']:>7.0f}ms  p95 {latency['p95']:>7.0f}ms  退出码 {result['exit_code']}")
+        finally:
+            server.shutdown()
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"📝 结果已写入 {args.output}")
@@ -9,11 +9,55 @@ GTX Gaming 自动登录和续期脚本
 # =====================================================================
 
 import os
+import sys
 import time
+import argparse
 import json
+import csv
+import fnmatch
+import glob
+import html
 import re
+import io
+import random
+import queue
+import hashlib
+import signal
+import socket
+import socketserver
+import sqlite3
+import threading
+import http.client
+import http.cookies
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+from contextlib import contextmanager, redirect_stdout
+from dataclasses import dataclass, field
 from datetime import datetime, timezone, timedelta
-from playwright.sync_api import sync_playwright, Cookie
+from typing import List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows 下没有 fcntl，退化为不加锁
+    fcntl = None
+
+
+# Playwright 与 Pillow 按需导入：不需要浏览器的运行（HTTP 续期、没有待处理的服务器、
+# 配置错误或登录预检失败）不承担导入开销
+def playwright_api():
+    """返回 playwright.sync_api 模块（首次调用时导入）"""
+    from playwright import sync_api
+    return sync_api
+
+
+def pillow_image():
+    """返回 PIL.Image 模块，未安装 Pillow 时返回 None（可选依赖，仅 WebP 截图需要）"""
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+    return Image
 
 # =====================================================================
 #                           配置区域
@@ -26,16 +70,2392 @@ LOGIN_PASSWORD = os.getenv('LOGIN_PASSWORD', "")  # 密码登录
 
 # 服务器配置
 SERVER_LIST = os.getenv('SERVER_LIST', "")  # JSON格式的服务器列表
+SERVER_LIST_FILE = os.getenv('SERVER_LIST_FILE', "")  # 服务器清单文件（.json / .jsonl / .csv），优先于 SERVER_LIST
+# 服务器筛选 - 只处理部分服务器（逗号分隔）
+SERVER_TAGS = os.getenv('SERVER_TAGS', "")  # 只处理带有任一标签的服务器
+SERVER_EXCLUDE_TAGS = os.getenv('SERVER_EXCLUDE_TAGS', "")  # 跳过带有任一标签的服务器
+SERVER_MATCH = os.getenv('SERVER_MATCH', "")  # 按名称或 server_id 通配匹配，如 "eu-*,7672d140"
 
-# 网址配置
-BASE_URL = 'https://gamepanel2.gtxgaming.co.uk'
-LOGIN_URL = 'https://gamepanel2.gtxgaming.co.uk/auth/login'
-HOME_URL = 'https://gamepanel2.gtxgaming.co.uk/home'
+# 网址配置 - GTX_BASE_URL 可指向本地模拟面板（mock_panel.py）用于测试与基准测试
+DEFAULT_BASE_URL = 'https://gamepanel2.gtxgaming.co.uk'
+BASE_URL = os.getenv('GTX_BASE_URL', DEFAULT_BASE_URL).rstrip('/')
+LOGIN_URL = BASE_URL + '/auth/login'
+HOME_URL = BASE_URL + '/home'
+# remember_web Cookie 的作用域，默认面板为整个 gtxgaming.co.uk 域
+COOKIE_DOMAIN = '.gtxgaming.co.uk' if BASE_URL == DEFAULT_BASE_URL else urllib.parse.urlsplit(BASE_URL).hostname
+REMEMBER_WEB_COOKIE_NAME = 'remember_web_59ba36addc2b2f9401580f014c7f58ea4e30989d'
 
 # 运行配置
 HEADLESS = True  # 默认无头模式，适合自动化环境
 SCREENSHOT_ENABLED = True  # 是否启用截图功能
 
+# 截图配置
+# 截图策略: off / all / errors（仅失败时）/ sample:N（每 N 个服务器抽取 1 个，失败时始终截图）
+SCREENSHOT_MODE = os.getenv('SCREENSHOT_MODE', 'all' if SCREENSHOT_ENABLED else 'off')
+SCREENSHOT_SCOPE = os.getenv('SCREENSHOT_SCOPE', 'full')  # full: 整页 / viewport: 可视区域 / element: 指定元素
+SCREENSHOT_ELEMENT = os.getenv('SCREENSHOT_ELEMENT', 'main')  # SCREENSHOT_SCOPE=element 时截取的元素
+SCREENSHOT_FORMAT = os.getenv('SCREENSHOT_FORMAT', 'jpeg')  # png / jpeg / webp（webp 需要 Pillow）
+SCREENSHOT_QUALITY = int(os.getenv('SCREENSHOT_QUALITY', '70') or 70)  # jpeg / webp 压缩质量
+
+# 并发配置
+# 大于 1 时启用并发模式：工作线程共享 HTTP 引擎与已登录会话（storage_state）。
+# Playwright 同步 API 不能跨线程共享，需要浏览器的工作线程各自启动一个 Playwright 驱动与 Chromium，
+# 每个约占 200–300MB 内存，因此同时运行的浏览器数量另由 BROWSER_CONCURRENCY 限制
+CONCURRENCY = max(1, int(os.getenv('CONCURRENCY', '1') or 1))
+# 同时运行的浏览器上限（含主线程）；多账号共用浏览器进程时固定为 1，超出名额的浏览器回退交给主线程处理
+BROWSER_CONCURRENCY = max(1, int(os.getenv('BROWSER_CONCURRENCY', '2') or 2))
+
+# 内存治理配置 - 长批次中定期回收页面/上下文，避免 Chromium 内存持续增长
+MEMORY_RECYCLE_SERVERS = int(os.getenv('MEMORY_RECYCLE_SERVERS', '50') or 0)  # 每个页面处理多少个服务器后重建页面，0 为不限
+MEMORY_RSS_LIMIT_MB = float(os.getenv('MEMORY_RSS_LIMIT_MB', '1024') or 0)  # 每个浏览器（驱动+浏览器进程）的 RSS 上限，超过时重建上下文，0 为不限
+MEMORY_SAMPLE_INTERVAL = 2  # 两次读取进程树 RSS 的最小间隔（秒）
+
+# 等待超时配置（毫秒）- 以事件完成信号代替固定等待
+RENEW_RESPONSE_TIMEOUT = 10000  # 点击续期后等待续期接口响应的超时
+EXPIRE_UPDATE_TIMEOUT = 10000  # 续期后等待到期时间文本变化的超时
+
+# 续期引擎配置
+# auto: 优先使用 HTTP 引擎，失败时回退到浏览器；http: 仅 HTTP；browser: 仅浏览器
+RENEW_ENGINE = os.getenv('RENEW_ENGINE', 'auto').strip().lower() or 'auto'
+AUTH_CHECK_PATH = '/api/client'  # 会话校验接口（已登录返回 200）
+RENEW_INFO_PATH = '/api/client/freeservers/{server_id}'  # 免费服务器信息接口
+RENEW_API_PATH = '/api/client/freeservers/{server_id}/renew'  # 续期接口
+HTTP_POOL_SIZE = 4  # keep-alive 连接池大小
+HTTP_TIMEOUT = 30  # 单个 HTTP 请求超时（秒）
+STATUS_CONCURRENCY = max(1, int(os.getenv('STATUS_CONCURRENCY', '16') or 16))  # status 模式并发查询数
+HTTP_USER_AGENT = ('Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 '
+                   '(KHTML, like Gecko) Chrome/120.0 Safari/537.36')
+
+# 会话缓存配置 - 登录成功后保存 storage_state（Cookie + 本地存储），下次运行直接复用
+SESSION_CACHE_FILE = os.getenv('SESSION_CACHE_FILE', '.gtx_session.json')  # 留空则禁用
+
+# 资源拦截配置 - 页面加载时拦截续期流程用不到的图片、字体、统计与客服插件
+# 默认关闭：启用任何路由后 Playwright 会禁用 HTTP 缓存，面板的 JS/CSS 每个页面都要重新下载，
+# 且每个请求都要经过 Python 回调；开启前请用 benchmark.py --resource-blocking on/off 对比
+RESOURCE_BLOCKING = os.getenv('RESOURCE_BLOCKING', 'false').lower() in ('1', 'true', 'yes', 'on')
+# 按资源类型拦截（逗号分隔，Playwright resource_type）
+BLOCK_RESOURCE_TYPES = os.getenv('BLOCK_RESOURCE_TYPES', 'image,media,font')
+# 按 URL 拦截（逗号分隔的正则表达式）
+BLOCK_URL_PATTERNS = os.getenv('BLOCK_URL_PATTERNS', ','.join([
+    r'google-analytics\.com', r'googletagmanager\.com', r'doubleclick\.net',
+    r'googlesyndication\.com', r'facebook\.(com|net)', r'hotjar\.com',
+    r'cloudflareinsights\.com', r'tawk\.to', r'crisp\.chat', r'intercom(cdn)?\.io',
+]))
+# 白名单（优先级高于拦截规则），默认放行面板接口，保证续期按钮与到期时间正常工作
+ALLOW_URL_PATTERNS = os.getenv('ALLOW_URL_PATTERNS', r'/api/')
+
+# 多账号配置 - JSON 列表，每项包含 name、cookie 或 email/password 以及 servers
+# 例: [{"name": "主账号", "cookie": "...", "servers": [{"url": "...", "name": "..."}]}]
+ACCOUNTS = os.getenv('ACCOUNTS', "")
+ACCOUNTS_FILE = os.getenv('ACCOUNTS_FILE', "")  # 也可以从文件读取账号列表
+ACCOUNTS_PER_PROCESS = max(1, int(os.getenv('ACCOUNTS_PER_PROCESS', '20') or 20))  # 超过后分摊到多个进程
+ACCOUNT_PROCESSES = max(1, int(os.getenv('ACCOUNT_PROCESSES', '4') or 4))  # 进程池上限
+
+# 续期计划配置 - 根据上次记录的到期时间跳过尚未进入续期窗口的服务器
+SERVER_STATE_FILE = os.getenv('SERVER_STATE_FILE', '.gtx_server_state.json')  # 留空则禁用
+RENEW_WINDOW_HOURS = float(os.getenv('RENEW_WINDOW_HOURS', '48') or 48)  # 剩余时间小于该值才续期
+RENEW_COOLDOWN_HOURS = float(os.getenv('RENEW_COOLDOWN_HOURS', '20') or 20)  # 每天只能续期一次，冷却期内不重复尝试
+PANEL_UTC_OFFSET_HOURS = float(os.getenv('PANEL_UTC_OFFSET_HOURS', '0') or 0)  # 面板显示时间的时区
+FORCE_RENEW = os.getenv('FORCE_RENEW', '').lower() in ('1', 'true', 'yes', 'on')  # 忽略计划，处理全部服务器
+RUN_BUDGET_SECONDS = float(os.getenv('RUN_BUDGET_SECONDS', '0') or 0)  # 整次运行的时间预算（自进程启动起），0 为不限
+RUN_BUDGET_RESERVE_SECONDS = float(os.getenv('RUN_BUDGET_RESERVE_SECONDS', '30') or 30)  # 为生成报告、通知等收尾预留的时间
+
+# 分片与租约配置 - 多个运行节点分担同一份服务器清单
+SHARD_INDEX = int(os.getenv('SHARD_INDEX', '0') or 0)  # 本节点的分片序号（从 0 开始）
+SHARD_COUNT = max(1, int(os.getenv('SHARD_COUNT', '1') or 1))  # 分片总数，按 server_id 稳定哈希分配
+LEASE_DB = os.getenv('LEASE_DB', "")  # 节点间共享的租约库（SQLite），设置后处理前先认领 server_id
+LEASE_TTL_SECONDS = float(os.getenv('LEASE_TTL_SECONDS', '900') or 900)  # 租约有效期，节点崩溃后过期租约可被接管
+NODE_ID = os.getenv('NODE_ID', "") or f"{socket.gethostname()}-{os.getpid()}"
+SHARD_RESULTS_DIR = os.getenv('SHARD_RESULTS_DIR', 'shard_results')  # 各节点结果输出目录，供 merge 命令合并
+# 同一次运行中各节点共用的运行标识，merge 只合并最新一次运行的结果；GitHub Actions 中默认取 GITHUB_RUN_ID
+SHARD_RUN_ID = os.getenv('SHARD_RUN_ID', "") or os.getenv('GITHUB_RUN_ID', "")
+
+# 运行历史配置 - 每次运行与每个服务器的结果追加写入 SQLite，README 据此渲染结果与趋势
+RUN_HISTORY_DB = os.getenv('RUN_HISTORY_DB', '.gtx_history.db')  # 留空则禁用
+RUN_HISTORY_TREND_DAYS = int(os.getenv('RUN_HISTORY_TREND_DAYS', '14') or 14)  # README 趋势表展示的天数
+
+# 页面元素选择器
+EXPIRY_SELECTOR = 'p:has-text("Expiry Date")'
+RENEW_BUTTON_SELECTOR = 'button:has-text("EXTEND 72 HOUR(S)")'
+ALREADY_EXTENDED_SELECTORS = [
+    '.alert.alert-danger',
+    '.error-message',
+    '.form-error',
+    '[role="alert"]',
+    'div:has-text("already extended")',
+    'div:has-text("once per day")',
+    'div:has-text("You have already extended")',
+]
+ALREADY_EXTENDED_KEYWORDS = ['already extended', 'once per day', 'you have already', '已经续期', '每天只能']
+# 每个逻辑元素的候选选择器：记录上次命中的候选并优先尝试，界面改版时依次回退
+# 续期按钮会被点击，只用精确的选择器：宽松的候选可能在按钮隐藏（已续期）时点中其他按钮或链接
+SELECTOR_CANDIDATES = {
+    'expiry': [EXPIRY_SELECTOR, 'p:has-text("Expiry")', 'div:has-text("Expiry Date")',
+               'span:has-text("Expiry Date")', 'td:has-text("Expiry")'],
+    'renew_button': [RENEW_BUTTON_SELECTOR],
+    'already_extended': ALREADY_EXTENDED_SELECTORS,
+}
+SELECTOR_CACHE_FILE = os.getenv('SELECTOR_CACHE_FILE', '.gtx_selectors.json')  # 留空则不持久化
+SELECTOR_WAIT_TIMEOUT = 5000  # 等待元素出现的上限（毫秒）
+SELECTOR_MISS_TIMEOUT = 1000  # 上次查找全部落空（界面可能已改版）时的等待上限（毫秒）
+
+# 常驻进程配置 - python main.py daemon 启动，python main.py submit ... 提交任务
+DAEMON_SOCKET = os.getenv('DAEMON_SOCKET', '/tmp/gtx-renewer.sock')  # Unix Socket 路径
+DAEMON_RECYCLE_SERVERS = int(os.getenv('DAEMON_RECYCLE_SERVERS', '200') or 200)  # 处理多少个服务器后回收浏览器
+DAEMON_HEALTH_INTERVAL = int(os.getenv('DAEMON_HEALTH_INTERVAL', '300') or 300)  # 空闲时健康检查间隔（秒）
+DAEMON_JOB_TIMEOUT = int(os.getenv('DAEMON_JOB_TIMEOUT', '1800') or 1800)  # 单个任务的最长等待时间（秒）
+
+# 容错配置
+RETRY_ATTEMPTS = int(os.getenv('RETRY_ATTEMPTS', '3') or 3)  # 每个阶段（导航/读取到期时间/点击/请求）的最大尝试次数
+RETRY_BASE_DELAY = float(os.getenv('RETRY_BASE_DELAY', '1') or 1)  # 退避基准间隔（秒）
+RETRY_MAX_DELAY = float(os.getenv('RETRY_MAX_DELAY', '15') or 15)  # 退避间隔上限（秒）
+BREAKER_WINDOW = 10  # 熔断器统计最近多少次调用
+BREAKER_MIN_CALLS = 4  # 至少多少次调用后才可能熔断
+BREAKER_FAILURE_RATE = float(os.getenv('BREAKER_FAILURE_RATE', '0.5') or 0.5)  # 熔断失败率阈值
+BREAKER_COOLDOWN = float(os.getenv('BREAKER_COOLDOWN', '60') or 60)  # 熔断后冷却时间（秒）
+ADAPTIVE_TIMEOUT_MIN = 10  # 自适应超时下限（秒）
+ADAPTIVE_TIMEOUT_MAX = 60  # 自适应超时上限（秒），与原固定超时一致
+
+# 通知配置 - 运行结束后由脚本直接发送，未配置任何通道时不发送
+# 通知模式: digest（每个账号一份完整摘要）/ changes（仅续期成功、失败或被延后的服务器）/ off
+NOTIFY_MODE = os.getenv('NOTIFY_MODE', 'digest').strip().lower() or 'digest'
+NOTIFY_COALESCE_SECONDS = float(os.getenv('NOTIFY_COALESCE_SECONDS', '2') or 2)  # 合并该时间窗口内的通知
+TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN', "")
+TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID', "")
+TELEGRAM_API_BASE = os.getenv('TELEGRAM_API_BASE', 'https://api.telegram.org').rstrip('/')  # 兼容 Telegram 的 Bot API
+TELEGRAM_MESSAGE_LIMIT = 4000  # 单条消息字符上限（Telegram 为 4096）
+NOTIFY_WEBHOOK_URL = os.getenv('NOTIFY_WEBHOOK_URL', "")  # 以 JSON POST 通知内容
+NOTIFY_FILE = os.getenv('NOTIFY_FILE', "")  # 以 JSONL 追加写入通知内容（本地调试）
+# GitHub Actions 运行页面，用于通知中的日志与截图链接
+RUN_URL = (f"{os.getenv('GITHUB_SERVER_URL')}/{os.getenv('GITHUB_REPOSITORY')}/actions/runs/{os.getenv('GITHUB_RUN_ID')}"
+           if os.getenv('GITHUB_RUN_ID') else "")
+
+# 耗时埋点配置
+TRACE_FILE = os.getenv('TRACE_FILE', 'trace.jsonl')  # 阶段耗时 JSONL 输出文件，留空则只输出汇总
+# 大于 0 时开启 Playwright tracing，仅保留处理耗时超过该秒数的服务器的 trace_<server_id>.zip
+TRACE_SLOW_SECONDS = float(os.getenv('TRACE_SLOW_SECONDS', '0') or 0)
+
+# 到期时间格式 YYYY-MM-DD HH:MM:SS
+EXPIRE_TIME_PATTERN = r'\d{4}-\d{2}-\d{2}\s+\d{2}:\d{2}:\d{2}'
+
+# =====================================================================
+#                           账号配置
+# =====================================================================
+
+def default_account():
+    """由环境变量组成的默认账号"""
+    return {
+        'name': "",
+        'remember_web_cookie': REMEMBER_WEB_COOKIE,
+        'email': LOGIN_EMAIL,
+        'password': LOGIN_PASSWORD,
+        'servers': None,  # None 表示从 SERVER_LIST_FILE 或 SERVER_LIST 环境变量读取
+        'servers_file': SERVER_LIST_FILE,
+    }
+
+
+def normalize_account(entry, index):
+    """规范化单个账号配置，配置无效时抛出 ValueError"""
+    if not isinstance(entry, dict):
+        raise ValueError(f"第 {index + 1} 个账号配置必须是对象: {entry!r}")
+    servers = entry.get('servers', entry.get('server_list')) or []
+    if isinstance(servers, str):
+        servers = json.loads(servers)
+    return {
+        'name': str(entry.get('name') or f"account{index + 1}"),
+        'remember_web_cookie': entry.get('remember_web_cookie') or entry.get('cookie') or "",
+        'email': entry.get('email') or entry.get('login_email') or "",
+        'password': entry.get('password') or entry.get('login_password') or "",
+        'servers': None if entry.get('servers_file') else server_entries_from_json(servers),
+        'servers_file': entry.get('servers_file') or "",
+    }
+
+
+def load_accounts():
+    """从 ACCOUNTS_FILE 或 ACCOUNTS 环境变量读取多账号配置（列表或 {"accounts": [...]}），未配置或无效时返回空列表"""
+    try:
+        if ACCOUNTS_FILE:
+            with open(ACCOUNTS_FILE, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+        elif ACCOUNTS:
+            entries = json.loads(ACCOUNTS)
+        else:
+            return []
+        if isinstance(entries, dict):
+            entries = entries.get('accounts')
+        if not isinstance(entries, list):
+            raise ValueError('多账号配置必须是列表或 {"accounts": [...]}')
+        return [normalize_account(entry, index) for index, entry in enumerate(entries)]
+    except (OSError, ValueError) as e:
+        print(f"❌ 解析多账号配置失败: {e}")
+        return []
+
+# =====================================================================
+#                           服务器清单
+# =====================================================================
+
+def split_list(value):
+    """把逗号/分号/竖线分隔的字符串或列表转换为去除空白的列表"""
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = re.split(r'[,;|]', value)
+    return [str(item).strip() for item in value if str(item).strip()]
+
+
+def normalize_server_entry(entry, base_url=BASE_URL):
+    """校验并规范化单个服务器配置，返回 {'url', 'name', 'server_id', 'tags'}
+
+    entry 可以是完整地址、相对路径（/server/<id>）、裸 server_id，或包含 url/id、name、tags 的字典。
+    配置无效时抛出 ValueError。
+    """
+    if isinstance(entry, str):
+        entry = {'url': entry}
+    if not isinstance(entry, dict):
+        raise ValueError(f"无法识别的服务器配置: {entry!r}")
+    
+    raw_url = str(entry.get('url') or entry.get('server_id') or entry.get('id') or '').strip()
+    if not raw_url:
+        raise ValueError(f"缺少服务器地址: {entry}")
+    if '/' not in raw_url:
+        raw_url = f"/server/{raw_url}"
+    parsed = urllib.parse.urlsplit(urllib.parse.urljoin(base_url + '/', raw_url))
+    path = parsed.path.rstrip('/')
+    if parsed.scheme not in ('http', 'https') or not parsed.netloc or not path:
+        raise ValueError(f"服务器地址无效: {raw_url}")
+    url = urllib.parse.urlunsplit((parsed.scheme, parsed.netloc.lower(), path, '', ''))
+    
+    return {
+        'url': url,
+        'name': str(entry.get('name') or '').strip(),
+        'server_id': server_id_from_url(url),
+        'tags': split_list(entry.get('tags')),
+    }
+
+
+def read_inventory_file(path):
+    """按扩展名逐条读取清单文件：JSONL 与 CSV 逐行流式读取，JSON 为列表或 {"servers": [...]}"""
+    extension = os.path.splitext(path)[1].lower()
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        if extension == '.jsonl':
+            for line_number, line in enumerate(f, 1):
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError as e:
+                    print(f"⚠️ 跳过 {path} 第 {line_number} 行: {e}")
+        elif extension == '.csv':
+            for row in csv.DictReader(f):
+                yield {key.strip().lower(): (value or '').strip() for key, value in row.items() if key}
+        else:
+            yield from server_entries_from_json(json.load(f))
+
+
+def server_entries_from_json(data):
+    """从 JSON 清单中取出服务器条目：列表本身或 {"servers": [...]}，其他结构抛出 ValueError"""
+    if isinstance(data, dict):
+        data = data.get('servers')
+    if not isinstance(data, list):
+        raise ValueError('服务器清单必须是列表或 {"servers": [...]}')
+    return data
+
+
+class ServerFilter:
+    """按标签与名称/ID 通配符筛选服务器"""
+    
+    def __init__(self, tags=SERVER_TAGS, exclude_tags=SERVER_EXCLUDE_TAGS, match=SERVER_MATCH):
+        self.tags = set(split_list(tags))
+        self.exclude_tags = set(split_list(exclude_tags))
+        self.patterns = split_list(match)
+    
+    @property
+    def active(self):
+        return bool(self.tags or self.exclude_tags or self.patterns)
+    
+    def matches(self, server):
+        tags = set(server['tags'])
+        if self.tags and not tags & self.tags:
+            return False
+        if tags & self.exclude_tags:
+            return False
+        if self.patterns and not any(fnmatch.fnmatchcase(value, pattern)
+                                     for pattern in self.patterns
+                                     for value in (server['name'], server['server_id']) if value):
+            return False
+        return True
+
+
+def iter_servers(entries, server_filter=None):
+    """逐条规范化、按 server_id 去重并筛选，跳过无效配置"""
+    seen = set()
+    for entry in entries:
+        try:
+            server = normalize_server_entry(entry)
+        except ValueError as e:
+            print(f"⚠️ 跳过无效的服务器配置: {e}")
+            continue
+        if server['server_id'] in seen:
+            print(f"⚠️ 跳过重复的服务器: {server['name'] or server['server_id']}")
+            continue
+        seen.add(server['server_id'])
+        if server_filter is None or server_filter.matches(server):
+            yield server
+
+
+class ServerInventory:
+    """服务器清单：来源依次为账号内联列表、清单文件、SERVER_LIST 环境变量
+
+    只解析一次并缓存规范化后的结果；清单文件修改后（daemon 长期运行时）自动重新加载。
+    JSONL/CSV 按行流式读取，但规范化后的列表整体保存在内存中（每个服务器只占一个小字典）。
+    """
+    
+    def __init__(self, servers=None, path="", server_filter=None):
+        self.servers = servers
+        self.path = path
+        self.server_filter = server_filter or ServerFilter()
+        self._cache = None
+        self._cache_key = None
+    
+    def _source(self):
+        """返回 (来源描述, 原始条目迭代器, 缓存键)"""
+        if self.servers is not None:
+            return "账号配置", iter(self.servers), 'inline'
+        if self.path:
+            stat = os.stat(self.path)
+            return self.path, read_inventory_file(self.path), (stat.st_mtime_ns, stat.st_size)
+        entries = server_entries_from_json(json.loads(SERVER_LIST)) if SERVER_LIST else []
+        return "SERVER_LIST 环境变量", iter(entries), 'env'
+    
+    def load(self):
+        """返回规范化后的服务器列表，读取失败时返回空列表"""
+        try:
+            if self._cache is not None and self.path and self.servers is None:
+                stat = os.stat(self.path)
+                if (stat.st_mtime_ns, stat.st_size) == self._cache_key:
+                    return self._cache
+            elif self._cache is not None:
+                return self._cache
+            
+            source, entries, cache_key = self._source()
+            servers = list(iter_servers(entries, self.server_filter))
+        except (OSError, ValueError, csv.Error) as e:
+            print(f"❌ 读取服务器清单失败: {e}")
+            return []
+        
+        self._cache, self._cache_key = servers, cache_key
+        suffix = "（已按标签/名称筛选）" if self.server_filter.active else ""
+        print(f"从 {source} 读取到 {len(servers)} 个服务器配置{suffix}")
+        return servers
+
+# =====================================================================
+#                           会话缓存
+# =====================================================================
+
+def session_cache_path(account_name=""):
+    """返回账号对应的会话缓存文件路径，默认账号使用 SESSION_CACHE_FILE 本身"""
+    if not SESSION_CACHE_FILE or not account_name:
+        return SESSION_CACHE_FILE
+    root, ext = os.path.splitext(SESSION_CACHE_FILE)
+    slug = re.sub(r'[^A-Za-z0-9_-]+', '_', account_name)
+    return f"{root}.{slug}{ext or '.json'}"
+
+
+def load_session_cache(path=SESSION_CACHE_FILE):
+    """读取缓存的 storage_state，不存在或已损坏时返回 None"""
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        if isinstance(state, dict) and state.get('cookies'):
+            return state
+    except (OSError, ValueError) as e:
+        print(f"⚠️ 读取会话缓存失败: {e}")
+    invalidate_session_cache(path)
+    return None
+
+
+def save_session_cache(state, path=SESSION_CACHE_FILE):
+    """保存 storage_state 到缓存文件（仅当前用户可读写）"""
+    if not path or not state:
+        return
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        print(f"💾 会话已缓存: {path}")
+    except OSError as e:
+        print(f"⚠️ 保存会话缓存失败: {e}")
+
+
+def invalidate_session_cache(path=SESSION_CACHE_FILE):
+    """删除失效的会话缓存"""
+    if path and os.path.exists(path):
+        try:
+            os.remove(path)
+            print("🗑️ 会话缓存已失效并删除")
+        except OSError:
+            pass
+
+# =====================================================================
+#                           续期计划
+# =====================================================================
+
+def parse_panel_time(value):
+    """把面板显示的到期时间字符串转换为带时区的 datetime"""
+    if not value:
+        return None
+    try:
+        panel_tz = timezone(timedelta(hours=PANEL_UTC_OFFSET_HOURS))
+        return datetime.strptime(value, '%Y-%m-%d %H:%M:%S').replace(tzinfo=panel_tz)
+    except ValueError:
+        return None
+
+
+class ServerStateStore:
+    """按 server_id 持久化的服务器状态：最近到期时间、最近续期时间与结果"""
+    
+    def __init__(self, path=SERVER_STATE_FILE):
+        self.path = path
+        self.states = {}
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.states = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"⚠️ 读取服务器状态失败，将重新记录: {e}")
+    
+    def get(self, server_id):
+        """获取服务器状态，没有记录时返回空字典"""
+        return self.states.get(server_id, {})
+    
+    def record(self, result, checked_at=None):
+        """记录一次处理结果"""
+        server_id, status, old_expire, new_expire, server_name = result
+        checked_at = (checked_at or datetime.now(timezone.utc)).isoformat(timespec='seconds')
+        state = self.states.setdefault(server_id, {})
+        state['name'] = server_name
+        state['last_status'] = status
+        state['last_checked'] = checked_at
+        if new_expire or old_expire:
+            state['last_expiry'] = new_expire or old_expire
+        if status == "success":
+            state['last_renewed'] = checked_at
+        if status in ("success", "already_extended"):
+            state['last_attempt_ok'] = checked_at
+    
+    def save(self):
+        """原子写入状态文件"""
+        if not self.path:
+            return
+        try:
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.states, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"⚠️ 保存服务器状态失败: {e}")
+
+
+class RenewalPlanner:
+    """根据服务器状态决定哪些服务器需要本次处理"""
+    
+    def __init__(self, store, window_hours=RENEW_WINDOW_HOURS, cooldown_hours=RENEW_COOLDOWN_HOURS):
+        self.store = store
+        self.window = timedelta(hours=window_hours)
+        self.cooldown = timedelta(hours=cooldown_hours)
+    
+    def next_due_time(self, server_id):
+        """返回服务器下次需要处理的时间，None 表示现在就需要处理"""
+        state = self.store.get(server_id)
+        expiry = parse_panel_time(state.get('last_expiry'))
+        if state.get('last_status') not in ("success", "already_extended") or expiry is None:
+            return None
+        
+        due = expiry - self.window
+        last_ok = state.get('last_attempt_ok')
+        if last_ok:
+            due = max(due, datetime.fromisoformat(last_ok) + self.cooldown)
+        return due
+    
+    def plan(self, tasks, now=None):
+        """拆分为本次需要处理的任务和跳过的任务
+
+        返回 (due, skipped, next_run)：due 为 [(index, task)]，skipped 为 [(index, task, due_time)]，
+        next_run 为被跳过服务器中最早需要再次运行的时间。
+        """
+        now = now or datetime.now(timezone.utc)
+        due, skipped = [], []
+        for index, task in enumerate(tasks):
+            due_time = None if FORCE_RENEW else self.next_due_time(server_id_from_url(task[0]))
+            if due_time is None or due_time <= now:
+                due.append((index, task))
+            else:
+                skipped.append((index, task, due_time))
+        next_run = min((item[2] for item in skipped), default=None)
+        due.sort(key=lambda item: self.urgency(server_id_from_url(item[1][0])))
+        return due, skipped, next_run
+    
+    def urgency(self, server_id):
+        """排序键：到期时间未知的服务器最先处理，其余按上次记录的到期时间从早到晚"""
+        expiry = parse_panel_time(self.store.get(server_id).get('last_expiry'))
+        return (0, 0) if expiry is None else (1, expiry.timestamp())
+
+
+class RunBudget:
+    """全局运行时间预算：按观测到的单服务器耗时估算成本，剩余时间不足时延后处理（线程安全）
+
+    预算自整次运行开始（started_at，墙钟时间；默认为本进程启动时间）起计算并预留收尾时间，
+    进程池中的工作进程由主进程传入开始时间。单服务器耗时先取历史记录的均值，运行中按指数加权平均更新，
+    既没有历史也尚无观测时只要还有剩余时间就放行。放行发生在工作者即将开始处理时，
+    处理中的服务器在其他工作者上并行进行，因此只需剩余时间够处理这一个服务器。
+    """
+    
+    def __init__(self, budget_seconds=RUN_BUDGET_SECONDS, reserve_seconds=RUN_BUDGET_RESERVE_SECONDS,
+                 prior_seconds=None, started_at=None):
+        started_at = started_at or process_started_at()
+        self.deadline = started_at + budget_seconds - reserve_seconds
+        self.estimate = prior_seconds
+        self.observed = 0
+        self.in_flight = 0
+        self._lock = threading.Lock()
+    
+    def remaining(self):
+        return self.deadline - time.time()
+    
+    def observe(self, seconds):
+        """记录一个已放行服务器的实际耗时，并释放它的预留"""
+        with self._lock:
+            self.estimate = seconds if self.estimate is None else 0.7 * self.estimate + 0.3 * seconds
+            self.observed += 1
+            self.in_flight = max(0, self.in_flight - 1)
+    
+    def release(self):
+        """已放行的服务器没有实际处理（如被其他节点认领）时释放预留"""
+        with self._lock:
+            self.in_flight = max(0, self.in_flight - 1)
+    
+    def admit(self):
+        """剩余预算足够处理一个服务器时放行并计入处理中，返回 True"""
+        remaining = self.remaining()
+        with self._lock:
+            if remaining > 0 and remaining >= (self.estimate or 0):
+                self.in_flight += 1
+                return True
+            return False
+    
+    def shortfall(self):
+        """预算不足时的延后原因"""
+        with self._lock:
+            estimate, in_flight = self.estimate or 0, self.in_flight
+        return (f"时间预算不足：预计耗时 {estimate:.1f}s，处理中 {in_flight} 个，"
+                f"剩余预算 {max(self.remaining(), 0):.1f}s")
+
+# =====================================================================
+#                           运行历史
+# =====================================================================
+
+class RunHistoryStore:
+    """追加写入的运行历史（SQLite）：每次运行一行 runs，每个服务器结果一行 results
+
+    查询都走 (account, started_at) 与 (run_id) 索引，常年每日运行、数百个服务器时仍只读取所需的行。
+    """
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS runs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            account TEXT NOT NULL DEFAULT '',
+            started_at TEXT NOT NULL,
+            finished_at TEXT NOT NULL,
+            total INTEGER NOT NULL,
+            ok INTEGER NOT NULL,
+            failed INTEGER NOT NULL,
+            skipped INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_runs_account_started ON runs (account, started_at);
+        CREATE INDEX IF NOT EXISTS idx_runs_started ON runs (started_at);
+        CREATE TABLE IF NOT EXISTS results (
+            run_id INTEGER NOT NULL REFERENCES runs (id),
+            position INTEGER NOT NULL,
+            server_id TEXT NOT NULL,
+            server_name TEXT,
+            status TEXT NOT NULL,
+            old_expiry TEXT,
+            new_expiry TEXT,
+            margin_hours REAL,
+            durations TEXT,
+            PRIMARY KEY (run_id, position)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS idx_results_server ON results (server_id, run_id);
+    """
+    
+    def __init__(self, path=RUN_HISTORY_DB):
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(self.SCHEMA)
+    
+    @classmethod
+    def open(cls, path=RUN_HISTORY_DB):
+        """打开运行历史，未配置或无法打开时返回 None"""
+        if not path:
+            return None
+        try:
+            return cls(path)
+        except sqlite3.Error as e:
+            print(f"⚠️ 打开运行历史失败: {e}")
+            return None
+    
+    def close(self):
+        self.conn.close()
+    
+    def record_run(self, account, started_at, results, durations=None, finished_at=None):
+        """在一个事务内写入一次运行及其全部服务器结果，返回运行 ID
+
+        durations: {server_id: {阶段: 毫秒}}，来自 Tracer.server_durations
+        """
+        finished_at = finished_at or datetime.now(timezone.utc)
+        durations = durations or {}
+        statuses = [result[1] for result in results]
+        ok = sum(1 for status in statuses if status in ("success", "already_extended"))
+        skipped = statuses.count("skipped") + statuses.count("deferred")
+        
+        rows = []
+        for position, (server_id, status, old_expire, new_expire, server_name) in enumerate(results):
+            expiry = parse_panel_time(new_expire or old_expire)
+            margin = round((expiry - finished_at).total_seconds() / 3600, 2) if expiry else None
+            phases = durations.get(server_id)
+            rows.append((position, server_id, server_name, status, old_expire, new_expire, margin,
+                         json.dumps(phases) if phases else None))
+        
+        with self.conn:
+            cursor = self.conn.execute(
+                "INSERT INTO runs (account, started_at, finished_at, total, ok, failed, skipped) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (account or '', started_at.strftime('%Y-%m-%d %H:%M:%S'),
+                 finished_at.strftime('%Y-%m-%d %H:%M:%S'),
+                 len(results), ok, len(results) - ok - skipped, skipped))
+            run_id = cursor.lastrowid
+            self.conn.executemany(
+                "INSERT INTO results (run_id, position, server_id, server_name, status, old_expiry, "
+                "new_expiry, margin_hours, durations) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(run_id,) + row for row in rows])
+        return run_id
+    
+    def run_results(self, run_id):
+        """按原始顺序读取某次运行的结果元组"""
+        rows = self.conn.execute(
+            "SELECT server_id, status, old_expiry, new_expiry, server_name FROM results "
+            "WHERE run_id = ? ORDER BY position", (run_id,))
+        return [tuple(row) for row in rows]
+    
+    def average_server_seconds(self, account="", runs=3):
+        """最近几次运行中单个服务器的平均处理耗时（秒），没有记录时返回 None"""
+        rows = self.conn.execute("""
+            SELECT results.durations FROM results
+            WHERE results.run_id IN (SELECT id FROM runs WHERE account = ? ORDER BY started_at DESC LIMIT ?)
+              AND results.durations IS NOT NULL
+        """, (account or '', runs))
+        durations = [json.loads(row[0]).get('server') for row in rows]
+        durations = [duration for duration in durations if duration]
+        return sum(durations) / len(durations) / 1000 if durations else None
+    
+    def trends(self, account=None, days=RUN_HISTORY_TREND_DAYS):
+        """按天（UTC）汇总最近 days 天的运行：运行次数、续期成功率与平均剩余时长
+
+        返回 [(日期, 运行次数, 成功率或 None, 平均剩余小时或 None)]，按日期倒序。
+        """
+        since = (datetime.now(timezone.utc) - timedelta(days=days)).strftime('%Y-%m-%d %H:%M:%S')
+        account_filter = "" if account is None else "AND runs.account = ?"
+        params = [since] + ([] if account is None else [account])
+        rows = self.conn.execute(f"""
+            SELECT substr(runs.started_at, 1, 10) AS day,
+                   COUNT(DISTINCT runs.id),
+                   SUM(results.status IN ('success', 'already_extended')),
+                   SUM(results.status NOT IN ('skipped', 'deferred')),
+                   AVG(results.margin_hours)
+            FROM runs JOIN results ON results.run_id = runs.id
+            WHERE runs.started_at >= ? {account_filter}
+            GROUP BY day ORDER BY day DESC
+        """, params)
+        return [(day, runs, ok / attempted if attempted else None,
+                 round(margin, 1) if margin is not None else None)
+                for day, runs, ok, attempted, margin in rows]
+
+# =====================================================================
+#                           分片与租约
+# =====================================================================
+
+def shard_of(server_id, shard_count=SHARD_COUNT):
+    """按 server_id 的稳定哈希计算所属分片（各节点、各次运行结果一致）"""
+    return int(hashlib.sha1(server_id.encode('utf-8')).hexdigest()[:8], 16) % shard_count
+
+
+def sharding_enabled():
+    return SHARD_COUNT > 1 or bool(LEASE_DB)
+
+
+class LeaseStore:
+    """基于 SQLite 的服务器租约：节点处理服务器前认领 server_id，完成后记录结果（线程安全）
+
+    认领只在租约不存在、已过期或属于本节点且未完成时成功；完成的租约保留到续期冷却期结束，
+    其他节点据此跳过并直接引用结果。失败时释放租约，其他节点可以接手重试。
+    """
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS leases (
+            server_id TEXT PRIMARY KEY,
+            node TEXT NOT NULL,
+            expires_at REAL NOT NULL,
+            done INTEGER NOT NULL DEFAULT 0,
+            result TEXT
+        )
+    """
+    
+    def __init__(self, path=LEASE_DB, node_id=NODE_ID, ttl=LEASE_TTL_SECONDS):
+        self.path = path
+        self.node_id = node_id
+        self.ttl = ttl
+        self.claimed = 0
+        self.taken_by_others = 0
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute(self.SCHEMA)
+        self.conn.commit()
+        self._lock = threading.Lock()
+    
+    @classmethod
+    def open(cls, path=LEASE_DB):
+        """打开租约库，未配置或无法打开时返回 None"""
+        if not path:
+            return None
+        try:
+            return cls(path)
+        except sqlite3.Error as e:
+            print(f"⚠️ 打开租约库失败，不进行节点间协调: {e}")
+            return None
+    
+    def claim(self, server_id):
+        """认领服务器，成功返回 True"""
+        now = time.time()
+        with self._lock, self.conn:
+            cursor = self.conn.execute("""
+                INSERT INTO leases (server_id, node, expires_at) VALUES (?, ?, ?)
+                ON CONFLICT (server_id) DO UPDATE
+                SET node = excluded.node, expires_at = excluded.expires_at, done = 0, result = NULL
+                WHERE leases.expires_at < ? OR (leases.node = ? AND leases.done = 0)
+            """, (server_id, self.node_id, now + self.ttl, now, self.node_id))
+            claimed = cursor.rowcount > 0
+        with self._lock:
+            if claimed:
+                self.claimed += 1
+            else:
+                self.taken_by_others += 1
+        return claimed
+    
+    def complete(self, result):
+        """记录处理结果：成功保留租约到冷却期结束，失败或延后立即释放"""
+        server_id, status = result[0], result[1]
+        released = status in ("failed", "deferred")
+        expires_at = 0 if released else time.time() + RENEW_COOLDOWN_HOURS * 3600
+        with self._lock, self.conn:
+            self.conn.execute(
+                "UPDATE leases SET expires_at = ?, done = ?, result = ? WHERE server_id = ? AND node = ?",
+                (expires_at, int(not released), json.dumps(list(result), ensure_ascii=False),
+                 server_id, self.node_id))
+    
+    def result_for(self, server_id):
+        """其他节点已记录的结果元组，尚未完成时返回 None"""
+        with self._lock:
+            row = self.conn.execute("SELECT result FROM leases WHERE server_id = ? AND done = 1",
+                                    (server_id,)).fetchone()
+        return tuple(json.loads(row[0])) if row and row[0] else None
+    
+    def report(self):
+        print(f"🔒 节点 {self.node_id}：认领 {self.claimed} 个服务器，{self.taken_by_others} 个由其他节点处理")
+    
+    def close(self):
+        self.conn.close()
+
+
+def result_from_dict(data):
+    """result_to_dict 的逆操作"""
+    return (data['server_id'], data['status'], data.get('old_expire'), data.get('new_expire'), data.get('name', ''))
+
+
+def export_node_results(reports, timestamp, directory=SHARD_RESULTS_DIR):
+    """把本节点各账号的结果写入 <directory>/shard<序号>-<节点>.json，供 merge 命令合并
+
+    同一分片序号下属于其他运行（SHARD_RUN_ID 不同）的旧文件会被删除，目录不会随运行次数累积；
+    未设置 SHARD_RUN_ID 时无法区分运行，同一分片序号下的旧文件一律被替换。
+    """
+    try:
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, re.sub(r'[^\w.-]', '_', f"shard{SHARD_INDEX}-{NODE_ID}") + '.json')
+        for stale_path in glob.glob(os.path.join(directory, f"shard{SHARD_INDEX}-*.json")):
+            try:
+                with open(stale_path, 'r', encoding='utf-8') as f:
+                    stale = not SHARD_RUN_ID or json.load(f).get('run_id', '') != SHARD_RUN_ID
+            except (OSError, ValueError, AttributeError):
+                stale = True
+            if stale and stale_path != path:
+                os.remove(stale_path)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'run_id': SHARD_RUN_ID,
+                'node': NODE_ID,
+                'shard_index': SHARD_INDEX,
+                'shard_count': SHARD_COUNT,
+                'timestamp': timestamp,
+                'accounts': [{
+                    'name': report['name'],
+                    'success': report['success'],
+                    'next_run_time': report['next_run_time'].isoformat() if report['next_run_time'] else None,
+                    'results': [result_to_dict(result) for result in report['results']],
+                } for report in reports],
+            }, f, ensure_ascii=False, indent=2)
+        print(f"🧩 节点结果已写入 {path}")
+    except OSError as e:
+        print(f"⚠️ 写入节点结果失败: {e}")
+
+
+def merge_node_results(paths):
+    """合并多个节点的结果文件，返回 (最新运行时间, 账号报告列表)
+
+    只合并最新一次运行（最晚节点所属的 run_id）的文件，已从清单移除的服务器不会残留；
+    没有 run_id 的文件每个分片序号只取最新的一份，且分片数须与最新文件一致。
+    同一服务器出现在多个节点时取较晚节点的结果，同一时间下已处理的结果优先于跳过与延后。
+    """
+    nodes = []
+    for path in sorted(paths):
+        with open(path, 'r', encoding='utf-8') as f:
+            nodes.append(json.load(f))
+    if not nodes:
+        return "", []
+    newest = max(nodes, key=lambda node: node['timestamp'])
+    latest = newest['timestamp']
+    run_id = newest.get('run_id', '')
+    run_nodes = [node for node in nodes if node.get('run_id', '') == run_id]
+    if not run_id:
+        shards = {}
+        for node in run_nodes:
+            if node.get('shard_count') != newest.get('shard_count'):
+                continue
+            kept = shards.get(node.get('shard_index'))
+            if kept is None or node['timestamp'] > kept['timestamp']:
+                shards[node.get('shard_index')] = node
+        run_nodes = list(shards.values())
+    print(f"🧩 合并运行 {run_id or '（未设置 SHARD_RUN_ID）'} 的 {len(run_nodes)} 个节点结果"
+          + (f"，忽略 {len(nodes) - len(run_nodes)} 个旧运行的文件" if len(run_nodes) < len(nodes) else ""))
+    
+    accounts = {}
+    for node in run_nodes:
+        for account in node['accounts']:
+            merged = accounts.setdefault(account['name'], {
+                'name': account['name'], 'success': False, 'next_run_time': None, 'results': {}})
+            merged['success'] = merged['success'] or account['success']
+            if account['next_run_time']:
+                next_run = datetime.fromisoformat(account['next_run_time'])
+                merged['next_run_time'] = min(filter(None, [merged['next_run_time'], next_run]))
+            for data in account['results']:
+                result = result_from_dict(data)
+                rank = (node['timestamp'], result[1] not in ("skipped", "deferred"))
+                current = merged['results'].get(result[0])
+                if current is None or rank >= current[0]:
+                    merged['results'][result[0]] = (rank, result)
+    
+    reports = []
+    for merged in accounts.values():
+        merged['results'] = [result for _, result in merged['results'].values()]
+        reports.append(merged)
+    return latest, reports
+
+
+def run_merge(paths=None):
+    """合并各节点结果并生成 README.md"""
+    paths = paths or glob.glob(os.path.join(SHARD_RESULTS_DIR, '*.json'))
+    if not paths:
+        print(f"❌ 未找到节点结果文件（{SHARD_RESULTS_DIR}/*.json）")
+        return False
+    try:
+        timestamp, reports = merge_node_results(paths)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"❌ 读取节点结果失败: {e}")
+        return False
+    
+    next_run_time = min((report['next_run_time'] for report in reports if report['next_run_time']), default=None)
+    readme_content = render_readme_header(timestamp, next_run_time)
+    if len(reports) == 1 and not reports[0]['name']:
+        readme_content += render_server_results(reports[0]['results'])
+    else:
+        readme_content += f"**运行结果**: <br>\n"
+        for report in reports:
+            icon = "✅" if report['success'] else "❌"
+            readme_content += "\n" + render_server_results(
+                report['results'], title=f"#### 👤账号：{report['name']} {icon}\n\n")
+    write_readme(readme_content)
+    return all(report['success'] for report in reports)
+
+# =====================================================================
+#                           页面状态探测
+# =====================================================================
+
+# 读取 Navigation Timing（毫秒，相对导航开始）
+NAVIGATION_TIMING_SCRIPT = """
+() => {
+    const entry = performance.getEntriesByType('navigation')[0];
+    if (!entry) return null;
+    const keys = ['responseStart', 'responseEnd', 'domInteractive', 'domContentLoadedEventEnd',
+                  'loadEventEnd', 'duration', 'transferSize'];
+    return Object.fromEntries(keys.map(key => [key, Math.round(entry[key])]));
+}
+"""
+
+# 页面内查找元素，支持 CSS 与 'css:has-text("文本")' 两种选择器
+FIND_ELEMENT_JS = """
+(selector) => {
+    const m = selector.match(/^(.*?):has-text\\("(.*)"\\)$/);
+    if (!m) return document.querySelector(selector);
+    const needle = m[2].toLowerCase();
+    const matches = Array.from(document.querySelectorAll(m[1] || '*'))
+        .filter(el => (el.textContent || '').toLowerCase().includes(needle));
+    // 取最内层的匹配元素，避免把整页文本当作提示内容
+    return matches.find(el => !matches.some(other => other !== el && el.contains(other))) || null;
+}
+"""
+
+# 单次 evaluate 读取到期时间、续期按钮状态和错误提示；每类元素按候选顺序查找并返回命中的选择器
+PAGE_PROBE_SCRIPT = """
+({expirySelectors, buttonSelectors, errorSelectors, keywords}) => {
+    const find = __FIND__;
+    const first = (selectors) => {
+        for (const selector of selectors) {
+            const el = find(selector);
+            if (el) return [selector, el];
+        }
+        return [null, null];
+    };
+    const visible = (el) => !!el && el.getClientRects().length > 0;
+    const [expirySelector, expiry] = first(expirySelectors);
+    const [buttonSelector, button] = first(buttonSelectors);
+    const errorTexts = [];
+    let errorSelector = null;
+    for (const selector of errorSelectors) {
+        const el = find(selector);
+        if (!el) continue;
+        const text = (el.innerText || el.textContent || '').trim();
+        errorTexts.push(text);
+        // 找到已续期提示即可停止，无需继续扫描其余候选
+        if (keywords.some(keyword => text.toLowerCase().includes(keyword))) {
+            errorSelector = selector;
+            break;
+        }
+    }
+    return {
+        url: location.href,
+        expiryText: expiry ? (expiry.textContent || '').trim() : null,
+        expiryVisible: visible(expiry),
+        expirySelector,
+        buttonPresent: !!button,
+        buttonDisabled: !!button && (button.disabled || button.getAttribute('aria-disabled') === 'true'),
+        buttonSelector,
+        errorTexts,
+        errorSelector,
+    };
+}
+""".replace('__FIND__', FIND_ELEMENT_JS.strip())
+
+# 等待任一候选到期时间元素出现；传入 oldValue 时等待其文本不再包含旧值
+EXPIRY_WAIT_SCRIPT = """
+({selectors, oldValue}) => {
+    const find = __FIND__;
+    for (const selector of selectors) {
+        const el = find(selector);
+        if (el && (!oldValue || !(el.textContent || '').includes(oldValue))) return selector;
+    }
+    return false;
+}
+""".replace('__FIND__', FIND_ELEMENT_JS.strip())
+
+
+@dataclass
+class PageSnapshot:
+    """服务器页面状态快照"""
+    url: str = ""
+    expiry_text: Optional[str] = None
+    expiry_visible: bool = False
+    button_present: bool = False
+    button_disabled: bool = False
+    error_texts: List[str] = field(default_factory=list)
+    expiry_selector: Optional[str] = None  # 命中的候选选择器
+    button_selector: Optional[str] = None
+    error_selector: Optional[str] = None
+    
+    @classmethod
+    def from_probe(cls, data):
+        """由探测脚本的返回值构造快照"""
+        return cls(
+            url=data.get('url', ''),
+            expiry_text=data.get('expiryText'),
+            expiry_visible=bool(data.get('expiryVisible')),
+            button_present=bool(data.get('buttonPresent')),
+            button_disabled=bool(data.get('buttonDisabled')),
+            error_texts=list(data.get('errorTexts') or []),
+            expiry_selector=data.get('expirySelector'),
+            button_selector=data.get('buttonSelector'),
+            error_selector=data.get('errorSelector'),
+        )
+    
+    @property
+    def already_extended(self):
+        """页面是否显示已经续期过的提示"""
+        return any(keyword in text.lower()
+                   for text in self.error_texts for keyword in ALREADY_EXTENDED_KEYWORDS)
+
+
+class SelectorRegistry:
+    """选择器注册表：持久化每个逻辑元素上次命中的候选选择器并优先尝试，统计命中/回退/落空（线程安全）
+
+    命中第一个候选记为 hit，命中其他候选记为 fallback 并把它提到最前，全部落空记为 miss；
+    上次落空的元素改用较短的等待上限，界面改版时只是降级而不会每个服务器都等满超时。
+    """
+    
+    def __init__(self, path=SELECTOR_CACHE_FILE, candidates=None):
+        self.path = path
+        self.candidates = {name: list(selectors) for name, selectors in (candidates or SELECTOR_CANDIDATES).items()}
+        self.stats = {name: {'hits': 0, 'fallbacks': 0, 'misses': 0} for name in self.candidates}
+        self.missed = set()
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._load()
+    
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                winners = json.load(f).get('winners', {})
+        except (OSError, ValueError) as e:
+            print(f"⚠️ 读取选择器缓存失败: {e}")
+            return
+        for name, winner in winners.items():
+            if winner in self.candidates.get(name, []):
+                self._promote(name, winner)
+    
+    def _promote(self, name, selector):
+        selectors = self.candidates[name]
+        selectors.remove(selector)
+        selectors.insert(0, selector)
+    
+    def ordered(self, name):
+        """按上次命中顺序排列的候选选择器"""
+        with self._lock:
+            return list(self.candidates[name])
+    
+    def timeout(self, name):
+        """等待该元素的上限（毫秒）"""
+        return SELECTOR_MISS_TIMEOUT if name in self.missed else SELECTOR_WAIT_TIMEOUT
+    
+    def record(self, name, matched):
+        """记录一次查找结果，matched 为命中的选择器或 None"""
+        with self._lock:
+            stats = self.stats[name]
+            if matched is None:
+                stats['misses'] += 1
+                self.missed.add(name)
+                return
+            self.missed.discard(name)
+            if self.candidates[name][0] == matched:
+                stats['hits'] += 1
+            elif matched in self.candidates[name]:
+                stats['fallbacks'] += 1
+                print(f"🔀 元素 {name} 改用候选选择器: {matched}")
+                self._promote(name, matched)
+                self._dirty = True
+    
+    def save(self):
+        """有新的命中候选时写回缓存文件"""
+        with self._lock:
+            if not self.path or not self._dirty:
+                return
+            data = {'winners': {name: selectors[0] for name, selectors in self.candidates.items()}}
+            self._dirty = False
+        try:
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"⚠️ 保存选择器缓存失败: {e}")
+    
+    def report(self):
+        """输出各元素的命中统计"""
+        with self._lock:
+            lines = [f"{name}: 命中 {stats['hits']} / 回退 {stats['fallbacks']} / 落空 {stats['misses']}"
+                     for name, stats in self.stats.items() if any(stats.values())]
+        if lines:
+            print("🎯 选择器统计: " + "；".join(lines))
+
+# =====================================================================
+#                           耗时埋点
+# =====================================================================
+
+def process_uptime():
+    """当前进程自启动以来的秒数（含解释器启动与模块导入），无法读取 /proc 时返回 None"""
+    try:
+        with open('/proc/self/stat', 'r') as f:
+            start_ticks = int(f.read().rsplit(')', 1)[1].split()[19])
+        return time.clock_gettime(time.CLOCK_BOOTTIME) - start_ticks / os.sysconf('SC_CLK_TCK')
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def process_started_at():
+    """当前进程的启动时间（time.time() 墙钟时间），无法读取 /proc 时返回当前时间"""
+    return time.time() - (process_uptime() or 0)
+
+
+def percentile(values, ratio):
+    """最近秩法计算百分位数"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(ratio * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+class Tracer:
+    """阶段耗时埋点：记录 span 并追加写入 JSONL，运行结束时输出各阶段汇总（线程安全）"""
+    
+    def __init__(self, path=TRACE_FILE, account=""):
+        self.path = path
+        self.account = account
+        self.run_id = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S') + f"-{os.getpid()}"
+        self.spans = []
+        self._lock = threading.Lock()
+    
+    @contextmanager
+    def span(self, name, **attrs):
+        """记录一个阶段；可在 with 块内向返回的字典写入 outcome 等字段"""
+        record = {'run_id': self.run_id, 'name': name, 'start': time.time(),
+                  'thread': threading.current_thread().name}
+        if self.account:
+            record['account'] = self.account
+        record.update(attrs)
+        started = time.perf_counter()
+        try:
+            yield record
+        except Exception as e:
+            record.setdefault('outcome', 'error')
+            record['error'] = str(e)[:200]
+            raise
+        finally:
+            record['end'] = time.time()
+            record['duration_ms'] = round((time.perf_counter() - started) * 1000, 1)
+            record.setdefault('outcome', 'ok')
+            self._emit(record)
+    
+    def record(self, name, duration_ms, **attrs):
+        """记录一个在 span 之外测得的阶段（如进程冷启动）"""
+        record = {'run_id': self.run_id, 'name': name, 'start': time.time() - duration_ms / 1000,
+                  'thread': threading.current_thread().name, 'end': time.time(),
+                  'duration_ms': round(duration_ms, 1), 'outcome': 'ok'}
+        if self.account:
+            record['account'] = self.account
+        record.update(attrs)
+        self._emit(record)
+    
+    def _emit(self, record):
+        with self._lock:
+            self.spans.append(record)
+            if not self.path:
+                return
+            try:
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+            except OSError as e:
+                print(f"⚠️ 写入耗时记录失败: {e}")
+                self.path = None
+    
+    def server_durations(self, server_id=None):
+        """汇总指定服务器各阶段耗时（毫秒）；不指定时一次遍历返回 {server_id: {阶段: 毫秒}}"""
+        by_server = {}
+        with self._lock:
+            for record in self.spans:
+                sid = record.get('server_id')
+                if sid is None or (server_id is not None and sid != server_id):
+                    continue
+                durations = by_server.setdefault(sid, {})
+                durations[record['name']] = round(durations.get(record['name'], 0) + record['duration_ms'], 1)
+        return by_server if server_id is None else by_server.get(server_id, {})
+    
+    def summary(self):
+        """输出各阶段总耗时以及服务器处理耗时的 p50/p95"""
+        with self._lock:
+            spans = list(self.spans)
+        if not spans:
+            return
+        
+        phases = {}
+        for record in spans:
+            phases.setdefault(record['name'], []).append(record['duration_ms'])
+        
+        print("\n=== ⏱️ 阶段耗时汇总 ===")
+        for name, values in sorted(phases.items(), key=lambda item: -sum(item[1])):
+            print(f"{name:<16} 次数 {len(values):>4}  合计 {sum(values) / 1000:>8.2f}s  "
+                  f"p50 {percentile(values, 0.5):>8.0f}ms  p95 {percentile(values, 0.95):>8.0f}ms")
+        if self.path:
+            print(f"📝 详细记录: {self.path}")
+
+# =====================================================================
+#                           截图子系统
+# =====================================================================
+
+class ScreenshotManager:
+    """截图子系统：按策略决定是否截图，截图数据在后台线程完成转码、去重与写盘（线程安全）"""
+    
+    def __init__(self, mode=SCREENSHOT_MODE, scope=SCREENSHOT_SCOPE, image_format=SCREENSHOT_FORMAT,
+                 quality=SCREENSHOT_QUALITY, element_selector=SCREENSHOT_ELEMENT):
+        self.mode = mode.strip().lower()
+        self.sample_every = 1
+        if self.mode.startswith('sample'):
+            self.sample_every = max(1, int(self.mode.partition(':')[2] or 10))
+            self.mode = 'sample'
+        self.scope = scope
+        self.format = image_format.lower().replace('jpg', 'jpeg')
+        self.quality = quality
+        self.element_selector = element_selector
+        if self.format == 'webp' and pillow_image() is None:
+            print("⚠️ 未安装 Pillow，WebP 截图退化为 JPEG")
+            self.format = 'jpeg'
+        self.saved = 0
+        self.deduplicated = 0
+        self._sampled = {}
+        self._hashes = {}
+        self._lock = threading.Lock()
+        self._executor = None
+    
+    @property
+    def enabled(self):
+        return self.mode != 'off'
+    
+    def _should_capture(self, server_id, is_error):
+        if self.mode == 'all':
+            return True
+        if is_error:
+            return self.mode in ('errors', 'sample')
+        if self.mode == 'sample':
+            # 每 N 个服务器抽取 1 个完整记录（同一服务器的前后截图保持一致）
+            with self._lock:
+                if server_id not in self._sampled:
+                    self._sampled[server_id] = len(self._sampled) % self.sample_every == 0
+                return self._sampled[server_id]
+        return False
+    
+    def capture(self, page, server_id, kind, is_error=False):
+        """截图并提交后台写盘；截图本身必须在持有 page 的线程中完成"""
+        if not self.enabled or not self._should_capture(server_id, is_error):
+            return
+        
+        capture_type = 'png' if self.format in ('png', 'webp') else 'jpeg'
+        options = {'type': capture_type}
+        if capture_type == 'jpeg':
+            options['quality'] = self.quality
+        try:
+            if self.scope == 'element':
+                data = page.locator(self.element_selector).first.screenshot(timeout=5000, **options)
+            else:
+                data = page.screenshot(full_page=self.scope == 'full', **options)
+        except Exception as e:
+            print(f"⚠️ 截图失败 ({server_id}_{kind}): {e}")
+            return
+        
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="screenshot")
+            self._executor.submit(self._write, server_id, kind, data)
+    
+    def _write(self, server_id, kind, data):
+        digest = hashlib.sha256(data).hexdigest()
+        if kind == 'after' and self._hashes.get(server_id) == digest:
+            print(f"📸 续期后截图与续期前相同，跳过保存: {server_id}")
+            self.deduplicated += 1
+            return
+        if kind == 'before':
+            self._hashes[server_id] = digest
+        
+        if self.format == 'webp':
+            buffer = io.BytesIO()
+            pillow_image().open(io.BytesIO(data)).save(buffer, format='WEBP', quality=self.quality)
+            data = buffer.getvalue()
+        
+        extension = {'jpeg': 'jpg'}.get(self.format, self.format)
+        path = f"{server_id}_{kind}.{extension}"
+        try:
+            with open(path, 'wb') as f:
+                f.write(data)
+            print(f"📸 已保存截图: {path}")
+            self.saved += 1
+        except OSError as e:
+            print(f"⚠️ 保存截图失败 {path}: {e}")
+    
+    def flush(self):
+        """等待所有后台写盘任务完成"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+    
+    def reset(self):
+        """等待写盘完成并清空抽样与去重记录（daemon 每个任务结束后调用，避免常驻时无限增长）"""
+        self.flush()
+        with self._lock:
+            self._sampled.clear()
+            self._hashes.clear()
+    
+    def report(self):
+        """输出截图统计"""
+        if self.enabled:
+            print(f"📸 截图已保存 {self.saved} 张，去重跳过 {self.deduplicated} 张")
+
+# =====================================================================
+#                           资源拦截
+# =====================================================================
+
+class ResourceBlocker:
+    """浏览器上下文的请求拦截层：按资源类型与 URL 规则放行或拦截，并统计数量（线程安全）"""
+    
+    # 页面本身、脚本、样式与接口请求始终需要，否则到期时间元素与续期按钮无法渲染
+    ESSENTIAL_RESOURCE_TYPES = {'document', 'script', 'stylesheet', 'xhr', 'fetch'}
+    
+    def __init__(self, resource_types=BLOCK_RESOURCE_TYPES, deny_patterns=BLOCK_URL_PATTERNS,
+                 allow_patterns=ALLOW_URL_PATTERNS):
+        self.resource_types = {t.strip() for t in resource_types.split(',') if t.strip()}
+        self.resource_types -= self.ESSENTIAL_RESOURCE_TYPES
+        self.deny_patterns = [re.compile(p.strip()) for p in deny_patterns.split(',') if p.strip()]
+        self.allow_patterns = [re.compile(p.strip()) for p in allow_patterns.split(',') if p.strip()]
+        self.blocked = 0
+        self.allowed = 0
+        self._lock = threading.Lock()
+    
+    def should_block(self, resource_type, url):
+        """判断请求是否应被拦截"""
+        if resource_type == 'document':
+            return False
+        if any(p.search(url) for p in self.allow_patterns):
+            return False
+        if resource_type in self.resource_types:
+            return True
+        return any(p.search(url) for p in self.deny_patterns)
+    
+    def handle(self, route):
+        """Playwright 路由回调"""
+        request = route.request
+        blocked = self.should_block(request.resource_type, request.url)
+        with self._lock:
+            if blocked:
+                self.blocked += 1
+            else:
+                self.allowed += 1
+        if blocked:
+            route.abort()
+        else:
+            route.continue_()
+    
+    def attach(self, context):
+        """为浏览器上下文安装拦截规则"""
+        context.route("**/*", self.handle)
+    
+    def report(self):
+        """输出本次运行的拦截统计"""
+        total = self.blocked + self.allowed
+        if total:
+            print(f"🛡️ 资源拦截统计: 拦截 {self.blocked} 个 / 放行 {self.allowed} 个请求 "
+                  f"(拦截率 {self.blocked * 100 // total}%)")
+
+# =====================================================================
+#                           内存治理
+# =====================================================================
+
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+def read_rss(pid):
+    """读取进程常驻内存（字节），进程已退出或无法读取时返回 0"""
+    try:
+        with open(f'/proc/{pid}/statm', 'r') as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def descendant_pids(root_pid):
+    """扫描 /proc 返回 root_pid 的全部后代进程（Playwright 驱动及其启动的浏览器进程）"""
+    children = {}
+    try:
+        entries = os.listdir('/proc')
+    except OSError:
+        return []
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat', 'r') as f:
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    
+    pids, stack = [], list(children.get(root_pid, []))
+    while stack:
+        pid = stack.pop()
+        pids.append(pid)
+        stack.extend(children.get(pid, []))
+    return pids
+
+
+class MemoryGovernor:
+    """内存治理：监测脚本自身与驱动/浏览器进程树的 RSS，决定何时回收页面或上下文（线程安全）
+
+    页面处理满 recycle_servers 个服务器后重建页面；驱动+浏览器 RSS 超过上限时重建上下文。
+    并发时每个工作线程各有一套驱动与浏览器，上限按存活的浏览器数量放大；
+    上一次重建上下文没有释放内存时不再重建，直到 RSS 回落到上限以下。
+    两种回收都复用当前会话（storage_state），无需重新登录。
+    """
+    
+    def __init__(self, recycle_servers=MEMORY_RECYCLE_SERVERS, rss_limit_mb=MEMORY_RSS_LIMIT_MB,
+                 sample_interval=MEMORY_SAMPLE_INTERVAL):
+        self.recycle_servers = recycle_servers
+        self.rss_limit = rss_limit_mb * 1024 * 1024
+        self.sample_interval = sample_interval
+        self.self_rss = self.browser_rss = 0
+        self.peak_self_rss = self.peak_browser_rss = 0
+        self.page_recycles = 0
+        self.context_recycles = 0
+        self.browsers = 0
+        self._futile = False
+        self._sampled_at = 0
+        self._lock = threading.Lock()
+    
+    def browser_opened(self):
+        with self._lock:
+            self.browsers += 1
+    
+    def browser_closed(self):
+        with self._lock:
+            self.browsers = max(0, self.browsers - 1)
+    
+    def limit(self):
+        """当前生效的 RSS 上限（字节）：每个存活的浏览器一份，共用浏览器时按一份计"""
+        return self.rss_limit * max(1, self.browsers)
+    
+    def sample(self, force=False):
+        """读取进程树 RSS 并更新峰值，返回驱动+浏览器 RSS（字节）；间隔内重复调用返回上次结果"""
+        with self._lock:
+            if not force and time.monotonic() - self._sampled_at < self.sample_interval:
+                return self.browser_rss
+            self._sampled_at = time.monotonic()
+        
+        self_rss = read_rss(os.getpid())
+        browser_rss = sum(read_rss(pid) for pid in descendant_pids(os.getpid()))
+        with self._lock:
+            self.self_rss, self.browser_rss = self_rss, browser_rss
+            self.peak_self_rss = max(self.peak_self_rss, self_rss)
+            self.peak_browser_rss = max(self.peak_browser_rss, browser_rss)
+        return browser_rss
+    
+    def decide(self, servers_on_page):
+        """返回 'context'、'page' 或 None"""
+        if self.rss_limit:
+            over_limit = self.sample() > self.limit()
+            with self._lock:
+                if not over_limit:
+                    self._futile = False
+                elif not self._futile:
+                    return 'context'
+        if self.recycle_servers and servers_on_page >= self.recycle_servers:
+            return 'page'
+        return None
+    
+    def recycled(self, kind, rss_before=None):
+        """记录一次回收；重建上下文后立即重新采样，RSS 没有下降则暂停后续的上下文重建"""
+        with self._lock:
+            if kind == 'context':
+                self.context_recycles += 1
+            else:
+                self.page_recycles += 1
+            # 回收后立即重新采样，避免沿用回收前的读数连续回收
+            self._sampled_at = 0
+        if kind == 'context' and rss_before is not None:
+            freed = self.sample(force=True) < rss_before
+            with self._lock:
+                self._futile = not freed
+            if not freed:
+                print("⚠️ 重建上下文未释放内存，RSS 回落到上限以下前不再重建")
+    
+    def report(self):
+        """输出本次运行的内存峰值与回收次数"""
+        self.sample(force=True)
+        mb = 1024 * 1024
+        print(f"🧠 内存峰值: 脚本 {self.peak_self_rss / mb:.0f}MB，驱动+浏览器 {self.peak_browser_rss / mb:.0f}MB；"
+              f"回收页面 {self.page_recycles} 次，回收上下文 {self.context_recycles} 次")
+
+# =====================================================================
+#                           容错与熔断
+# =====================================================================
+
+def backoff_delay(attempt, base=RETRY_BASE_DELAY, cap=RETRY_MAX_DELAY):
+    """带抖动的指数退避（full jitter），attempt 从 1 开始"""
+    return random.uniform(base / 2, min(cap, base * (2 ** (attempt - 1))))
+
+
+def with_retries(stage, func, attempts=RETRY_ATTEMPTS, should_retry=None, retry_exceptions=Exception):
+    """只重试失败的阶段：抛出 retry_exceptions 异常或 should_retry(结果) 为真时按退避间隔重试，最后一次的结果原样返回或抛出"""
+    for attempt in range(1, attempts + 1):
+        try:
+            result = func()
+        except Exception as e:
+            if attempt >= attempts or not isinstance(e, retry_exceptions):
+                raise
+            reason = f"{type(e).__name__}: {str(e).splitlines()[0][:120] if str(e) else ''}"
+        else:
+            if should_retry is None or attempt >= attempts or not should_retry(result):
+                return result
+            reason = f"结果 {result}"
+        delay = backoff_delay(attempt)
+        print(f"🔁 {stage} 第 {attempt} 次失败（{reason}），{delay:.1f}s 后重试...")
+        time.sleep(delay)
+
+
+class CircuitBreaker:
+    """主机级熔断器：最近调用的失败率超过阈值时熔断，冷却后放行一次试探请求（线程安全）"""
+    
+    def __init__(self, name, window=BREAKER_WINDOW, min_calls=BREAKER_MIN_CALLS,
+                 failure_rate=BREAKER_FAILURE_RATE, cooldown=BREAKER_COOLDOWN):
+        self.name = name
+        self.outcomes = deque(maxlen=window)
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.cooldown = cooldown
+        self.opened_at = None
+        self.half_open = False
+        self._lock = threading.Lock()
+    
+    def allow(self):
+        """是否允许发起请求"""
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if self.half_open:
+                return False  # 已有试探请求在进行中
+            if time.monotonic() - self.opened_at >= self.cooldown:
+                self.half_open = True
+                print(f"🟡 熔断器半开，放行一次试探请求: {self.name}")
+                return True
+            return False
+    
+    def record(self, success):
+        """记录一次调用结果"""
+        with self._lock:
+            if self.half_open:
+                self.half_open = False
+                if success:
+                    print(f"🟢 试探成功，熔断器关闭: {self.name}")
+                    self.opened_at = None
+                    self.outcomes.clear()
+                else:
+                    self.opened_at = time.monotonic()
+                return
+            
+            self.outcomes.append(success)
+            failures = self.outcomes.count(False)
+            if (self.opened_at is None and len(self.outcomes) >= self.min_calls
+                    and failures / len(self.outcomes) >= self.failure_rate):
+                self.opened_at = time.monotonic()
+                print(f"🔴 失败率 {failures}/{len(self.outcomes)} 超过阈值，熔断 {self.cooldown:.0f}s: {self.name}")
+
+
+class AdaptiveTimeout:
+    """根据观测到的耗时自适应调整超时（平滑均值 + 4 倍平均偏差，限制在上下限之间，线程安全）"""
+    
+    def __init__(self, minimum=ADAPTIVE_TIMEOUT_MIN, maximum=ADAPTIVE_TIMEOUT_MAX, warmup=3):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.warmup = warmup
+        self.samples = 0
+        self.srtt = None
+        self.rttvar = 0.0
+        self._lock = threading.Lock()
+    
+    def observe(self, seconds):
+        """记录一次成功调用的耗时（秒）"""
+        with self._lock:
+            self.samples += 1
+            if self.srtt is None:
+                self.srtt, self.rttvar = seconds, seconds / 2
+            else:
+                self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - seconds)
+                self.srtt = 0.875 * self.srtt + 0.125 * seconds
+    
+    def timeout(self):
+        """当前超时（秒）；样本不足时使用上限"""
+        with self._lock:
+            if self.samples < self.warmup:
+                return self.maximum
+            return max(self.minimum, min(self.maximum, self.srtt + 4 * self.rttvar))
+
+
+_host_breakers = {}
+_host_timeouts = {}
+_host_lock = threading.Lock()
+
+
+def get_circuit_breaker(host):
+    """获取主机对应的熔断器（同一进程内共享）"""
+    with _host_lock:
+        if host not in _host_breakers:
+            _host_breakers[host] = CircuitBreaker(host)
+        return _host_breakers[host]
+
+
+def get_adaptive_timeout(host, kind):
+    """获取主机某类请求的自适应超时（同一进程内共享）"""
+    with _host_lock:
+        key = (host, kind)
+        if key not in _host_timeouts:
+            _host_timeouts[key] = AdaptiveTimeout()
+        return _host_timeouts[key]
+
+# =====================================================================
+#                    HTTP 续期引擎（无浏览器）
+# =====================================================================
+
+def server_id_from_url(server_url):
+    """从服务器地址中提取 server_id"""
+    return server_url.rstrip('/').split('/')[-1]
+
+
+def parse_expire_time(text):
+    """从文本中提取 YYYY-MM-DD HH:MM:SS 格式的到期时间"""
+    if not text:
+        return None
+    match = re.search(EXPIRE_TIME_PATTERN, text)
+    return match.group() if match else None
+
+
+class PanelResponse:
+    """面板 HTTP 响应"""
+    
+    def __init__(self, status, url, headers, text):
+        self.status = status
+        self.url = url
+        self.headers = headers
+        self.text = text
+    
+    def __repr__(self):
+        return f"HTTP {self.status}"
+    
+    def json(self):
+        """解析 JSON 响应体，失败时返回 None"""
+        try:
+            return json.loads(self.text)
+        except ValueError:
+            return None
+
+
+class PanelHTTPSession:
+    """面板 HTTP 会话：复用 keep-alive 连接池，并维护 Cookie 与 CSRF/XSRF 令牌（线程安全）"""
+    
+    def __init__(self, base_url=BASE_URL, pool_size=HTTP_POOL_SIZE, timeout=HTTP_TIMEOUT):
+        parsed = urllib.parse.urlsplit(base_url)
+        self.base_url = base_url.rstrip('/')
+        self.scheme = parsed.scheme
+        self.host = parsed.hostname
+        self.port = parsed.port
+        self.timeout = timeout
+        self.cookies = {}
+        self.csrf_token = None
+        self.latency = get_adaptive_timeout(self.host, 'http')
+        self.breaker = get_circuit_breaker(self.host)
+        self._pool = queue.LifoQueue(maxsize=pool_size)
+        self._lock = threading.Lock()
+    
+    def _new_connection(self):
+        if self.scheme == 'https':
+            return http.client.HTTPSConnection(self.host, self.port, timeout=self.timeout)
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+    
+    def _acquire(self):
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            return self._new_connection()
+    
+    def _release(self, conn):
+        try:
+            self._pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+    
+    def _build_headers(self, extra_headers):
+        headers = {
+            'User-Agent': HTTP_USER_AGENT,
+            'Accept': 'application/json, text/html;q=0.9, */*;q=0.8',
+            'X-Requested-With': 'XMLHttpRequest',
+            'Origin': self.base_url,
+            'Referer': self.base_url + '/',
+        }
+        with self._lock:
+            if self.cookies:
+                headers['Cookie'] = '; '.join(f"{k}={v}" for k, v in self.cookies.items())
+            xsrf = self.cookies.get('XSRF-TOKEN')
+            csrf = self.csrf_token
+        # Laravel 要求把 XSRF-TOKEN Cookie 解码后放回请求头
+        if xsrf:
+            headers['X-XSRF-TOKEN'] = urllib.parse.unquote(xsrf)
+        if csrf:
+            headers['X-CSRF-TOKEN'] = csrf
+        headers.update(extra_headers or {})
+        return headers
+    
+    def _store_cookies(self, response):
+        for header in response.headers.get_all('Set-Cookie') or []:
+            cookie = http.cookies.SimpleCookie()
+            try:
+                cookie.load(header)
+            except http.cookies.CookieError:
+                continue
+            with self._lock:
+                for name, morsel in cookie.items():
+                    if morsel['max-age'] == '0' or not morsel.value or morsel.value == 'deleted':
+                        self.cookies.pop(name, None)
+                    else:
+                        self.cookies[name] = morsel.value
+    
+    def _store_csrf_token(self, text):
+        match = re.search(r'<meta\s+name="csrf-token"\s+content="([^"]+)"', text or '')
+        if match:
+            self.csrf_token = match.group(1)
+    
+    def request(self, method, url, json_body=None, headers=None, max_redirects=5):
+        """发送请求并返回 PanelResponse；网络错误、超时与 429/5xx 计入主机熔断器"""
+        try:
+            response = self._send(method, url, json_body, headers, max_redirects)
+        except (OSError, http.client.HTTPException):
+            self.breaker.record(False)
+            raise
+        self.breaker.record(not is_transient_response(response))
+        return response
+    
+    def _send(self, method, url, json_body, headers, max_redirects):
+        """发送请求，自动处理 Cookie、重定向和失效的 keep-alive 连接"""
+        if url.startswith('/'):
+            url = self.base_url + url
+        body = None
+        extra_headers = dict(headers or {})
+        if json_body is not None:
+            body = json.dumps(json_body).encode('utf-8')
+            extra_headers['Content-Type'] = 'application/json'
+        
+        for _ in range(max_redirects + 1):
+            parsed = urllib.parse.urlsplit(url)
+            path = parsed.path or '/'
+            if parsed.query:
+                path += '?' + parsed.query
+            
+            response = None
+            for attempt in range(2):
+                conn = self._acquire()
+                timeout = min(self.timeout, self.latency.timeout())
+                conn.timeout = timeout
+                if conn.sock is not None:
+                    conn.sock.settimeout(timeout)
+                started = time.perf_counter()
+                try:
+                    conn.request(method, path, body=body, headers=self._build_headers(extra_headers))
+                    response = conn.getresponse()
+                    text = response.read().decode('utf-8', errors='replace')
+                    self.latency.observe(time.perf_counter() - started)
+                    break
+                except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                    # 服务端关闭了空闲连接，换新连接重试一次
+                    conn.close()
+                    if attempt:
+                        raise
+                except Exception:
+                    conn.close()
+                    raise
+            
+            self._store_cookies(response)
+            if response.will_close:
+                conn.close()
+            else:
+                self._release(conn)
+            
+            if response.status in (301, 302, 303, 307, 308) and response.getheader('Location'):
+                url = urllib.parse.urljoin(url, response.getheader('Location'))
+                if response.status in (301, 302, 303):
+                    method, body = 'GET', None
+                    extra_headers.pop('Content-Type', None)
+                continue
+            
+            self._store_csrf_token(text)
+            return PanelResponse(response.status, url, response.headers, text)
+        
+        raise RuntimeError(f"重定向次数过多: {url}")
+    
+    def load_storage_state(self, state):
+        """从 Playwright storage_state 中载入属于面板域名的 Cookie"""
+        with self._lock:
+            for cookie in state.get('cookies', []):
+                domain = cookie.get('domain', '').lstrip('.')
+                if domain and (self.host == domain or self.host.endswith('.' + domain)):
+                    self.cookies[cookie['name']] = cookie['value']
+    
+    def storage_state(self):
+        """导出为 Playwright storage_state 格式，供浏览器回退时复用会话"""
+        with self._lock:
+            cookies = dict(self.cookies)
+        return {
+            'cookies': [{
+                'name': name,
+                'value': value,
+                'domain': self.host,
+                'path': '/',
+                'expires': -1,
+                'httpOnly': True,
+                'secure': self.scheme == 'https',
+                'sameSite': 'Lax',
+            } for name, value in cookies.items()],
+            'origins': [],
+        }
+    
+    def close(self):
+        """关闭连接池中的所有连接"""
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+def is_transient_response(response):
+    """限流与服务端错误可以重试"""
+    return response.status == 429 or response.status >= 500
+
+
+# 连接尚未建立、请求肯定没有发出的错误；非幂等请求（续期 POST）只对这些异常重试，
+# 读取超时等请求可能已被面板处理的异常不重试，避免重复续期
+CONNECT_ERRORS = (ConnectionRefusedError, socket.gaierror)
+
+
+class HTTPRenewEngine:
+    """基于 HTTP 会话直接调用续期接口的引擎，无需启动浏览器"""
+    
+    def __init__(self, account=None, session=None):
+        self.account = account or default_account()
+        self.session = session or PanelHTTPSession()
+        self.session_cache_file = session_cache_path(self.account['name'])
+        self.unreachable = False  # 最近一次登录失败是否由网络错误或面板 5xx/429 引起
+        self.rejected = False  # 最近一次会话校验是否被面板明确拒绝（401 或重定向到登录页）
+    
+    def login(self):
+        """使用缓存会话、Cookie 或邮箱密码建立 HTTP 会话"""
+        remember_web_cookie = self.account['remember_web_cookie']
+        email, password = self.account['email'], self.account['password']
+        self.unreachable = self.rejected = False
+        try:
+            cached_state = load_session_cache(self.session_cache_file)
+            if cached_state:
+                print("💾 [HTTP] 尝试复用缓存会话...")
+                self.session.load_storage_state(cached_state)
+                if self.is_authenticated():
+                    print("✅ [HTTP] 缓存会话有效")
+                    return True
+                if self.unreachable:
+                    # 面板暂时不可用时无法判断会话是否失效，保留缓存供下次复用
+                    print("⚠️ [HTTP] 面板暂时不可用，无法验证缓存会话")
+                    return False
+                print("❌ [HTTP] 缓存会话已失效")
+                self.session.cookies.clear()
+                invalidate_session_cache(self.session_cache_file)
+            
+            if remember_web_cookie:
+                print("🍪 [HTTP] 尝试使用 Cookie 登录...")
+                self.session.cookies[REMEMBER_WEB_COOKIE_NAME] = remember_web_cookie
+                if self.is_authenticated():
+                    print("✅ [HTTP] Cookie 登录成功")
+                    save_session_cache(self.session.storage_state(), self.session_cache_file)
+                    return True
+                print("❌ [HTTP] Cookie 登录失败")
+                self.session.cookies.clear()
+            
+            if email and password:
+                print("📧 [HTTP] 尝试使用邮箱密码登录...")
+                # 先访问登录页获取 XSRF-TOKEN Cookie 和 csrf-token
+                self.session.request('GET', LOGIN_URL)
+                response = self.session.request('POST', LOGIN_URL, json_body={
+                    'user': email,
+                    'password': password,
+                })
+                if response.status < 400 and self.is_authenticated():
+                    print("✅ [HTTP] 邮箱密码登录成功")
+                    save_session_cache(self.session.storage_state(), self.session_cache_file)
+                    return True
+                print(f"❌ [HTTP] 邮箱密码登录失败 (HTTP {response.status})")
+        except Exception as e:
+            print(f"❌ [HTTP] 登录异常: {e}")
+            self.unreachable = True
+        return False
+    
+    def is_authenticated(self):
+        """通过客户端 API 检查会话是否有效"""
+        response = self.session.request('GET', AUTH_CHECK_PATH, headers={'Accept': 'application/json'})
+        self.unreachable = is_transient_response(response)
+        self.rejected = response.status == 401 or \
+            urllib.parse.urlsplit(response.url).path.rstrip('/') == urllib.parse.urlsplit(LOGIN_URL).path
+        return response.status == 200 and "login" not in response.url and "auth" not in response.url
+    
+    def get_expire_time(self, server_url, server_id):
+        """优先从 JSON 接口读取到期时间，失败时从服务器页面 HTML 中提取"""
+        response = with_retries(
+            "读取到期时间",
+            lambda: self.session.request('GET', RENEW_INFO_PATH.format(server_id=server_id),
+                                         headers={'Accept': 'application/json'}),
+            should_retry=is_transient_response)
+        if response.status == 200:
+            expire_time = parse_expire_time(response.text)
+            if expire_time:
+                return expire_time
+        
+        response = self.session.request('GET', server_url, headers={'Accept': 'text/html'})
+        if response.status == 200:
+            index = response.text.find('Expiry Date')
+            if index >= 0:
+                return parse_expire_time(response.text[index:index + 300])
+        return None
+    
+    def extend_server(self, server_url, server_name=""):
+        """直接 POST 续期接口；无法确定结果时返回 None，由调用方回退到浏览器"""
+        server_id = server_id_from_url(server_url)
+        print(f"\n=== [HTTP] 正在处理服务器: {server_name or server_id} ===")
+        
+        try:
+            old_expire_time = self.get_expire_time(server_url, server_id)
+            if old_expire_time:
+                print(f"📅 续期前到期时间: {old_expire_time}")
+            
+            response = with_retries(
+                "续期请求",
+                lambda: self.session.request('POST', RENEW_API_PATH.format(server_id=server_id),
+                                             json_body={}, headers={'Accept': 'application/json'}),
+                should_retry=is_transient_response, retry_exceptions=CONNECT_ERRORS)
+            
+            # 接口地址来自前端脚本推断，状态码本身不可信：
+            # 只有重新读取到的到期时间能印证时才采信，否则交给浏览器确认
+            if response.status == 200:
+                new_expire_time = parse_expire_time(response.text) or \
+                    self.get_expire_time(server_url, server_id)
+                old_expiry, new_expiry = parse_panel_time(old_expire_time), parse_panel_time(new_expire_time)
+                if new_expiry and (old_expiry is None or new_expiry > old_expiry):
+                    print("✅ 服务器成功延长时间 (HTTP 200)")
+                    print(f"📅 续期后到期时间: {new_expire_time}")
+                    return (server_id, "success", old_expire_time, new_expire_time, server_name)
+                print("⚠️ [HTTP] 续期接口返回 200，但到期时间没有延后")
+            elif response.status == 400:
+                new_expire_time = self.get_expire_time(server_url, server_id)
+                new_expiry = parse_panel_time(new_expire_time)
+                window_end = datetime.now(timezone.utc) + timedelta(hours=RENEW_WINDOW_HOURS)
+                if new_expiry and new_expiry > window_end:
+                    print("ℹ️ 服务器已经续期过了 (HTTP 400)")
+                    return (server_id, "already_extended", old_expire_time, None, server_name)
+                print("⚠️ [HTTP] 续期接口返回 400，但到期时间仍在续期窗口内")
+            else:
+                print(f"❌ [HTTP] 续期请求返回 HTTP {response.status}")
+        except Exception as e:
+            print(f"❌ [HTTP] 处理服务器 {server_name or server_id} 时发生错误: {e}")
+        return None
+    
+    def close(self):
+        """关闭 HTTP 会话"""
+        self.session.close()
+
+# =====================================================================
+#                           报告生成
+# =====================================================================
+
+def to_beijing_time(timestamp):
+    """把 UTC 时间字符串转换为北京时间（UTC+8）"""
+    try:
+        utc_time = datetime.strptime(timestamp, '%Y-%m-%d %H:%M:%S')
+        beijing_time = utc_time + timedelta(hours=8)
+        return beijing_time.strftime('%Y-%m-%d %H:%M:%S')
+    except:
+        return timestamp
+
+
+def render_readme_header(timestamp, next_run_time=None):
+    """生成 README 的运行时间部分"""
+    readme_content = f"**最后运行时间**: `{to_beijing_time(timestamp)}`\n\n"
+    if next_run_time:
+        next_run = (next_run_time.astimezone(timezone.utc) + timedelta(hours=8)).strftime('%Y-%m-%d %H:%M:%S')
+        readme_content += f"**下次需要运行时间**: `{next_run}`\n\n"
+    return readme_content
+
+
+# 结果状态对应的图标和文本
+STATUS_LABELS = {
+    "success": ("✅", "Success"),
+    "already_extended": ("ℹ️", "Unexpired"),
+    "skipped": ("⏭️", "Skipped"),
+    "deferred": ("⏳", "Deferred"),
+    "failed": ("❌", "Failed")
+}
+
+
+def render_server_results(server_results, title="**运行结果**: <br>\n"):
+    """生成服务器结果列表"""
+    readme_content = title
+    
+    for i, result in enumerate(server_results):
+        server_id, status, old_expire, new_expire, server_name = result
+        
+        # 状态图标和文本
+        status_icon, status_text = STATUS_LABELS.get(status, STATUS_LABELS["failed"])
+        
+        # 生成服务器信息
+        if server_name:
+            readme_content += f"🖥️服务器ID：`{server_name}({server_id})`<br>"
+        else:
+            readme_content += f"🖥️服务器ID：`{server_id}`<br>"
+        
+        readme_content += f"📊续期结果：{status_icon}{status_text}<br>"
+        
+        # 添加到期时间信息
+        if old_expire:
+            readme_content += f"🕛️旧到期时间：`{old_expire}`"
+            # 如果有新到期时间，则添加<br>
+            if new_expire and new_expire != old_expire:
+                readme_content += "<br>"
+        
+        if new_expire and new_expire != old_expire:
+            readme_content += f"🕡️新到期时间：`{new_expire}`"
+        
+        # 添加服务器之间的空行分隔
+        readme_content += "\n"
+        if i < len(server_results) - 1:
+            readme_content += "\n"
+    
+    return readme_content
+
+
+def render_history_trends(trends, title="**近期趋势**:\n\n"):
+    """生成按天汇总的运行趋势表"""
+    if not trends:
+        return ""
+    readme_content = "\n" + title
+    readme_content += "| 日期 (UTC) | 运行次数 | 续期成功率 | 平均剩余时长 |\n"
+    readme_content += "| --- | --- | --- | --- |\n"
+    for day, runs, success_rate, margin in trends:
+        rate = f"{success_rate:.0%}" if success_rate is not None else "-"
+        hours = f"{margin:.1f}h" if margin is not None else "-"
+        readme_content += f"| {day} | {runs} | {rate} | {hours} |\n"
+    return readme_content
+
+
+STATUS_FIELDS = ['account', 'server_id', 'name', 'url', 'expire_time', 'remaining_hours', 'state']
+
+
+def status_record(account, server_url, server_name, expire_time, now=None):
+    """生成一条服务器状态记录：state 为 ok / due（进入续期窗口）/ expired / unknown"""
+    now = now or datetime.now(timezone.utc)
+    expiry = parse_panel_time(expire_time)
+    remaining = round((expiry - now).total_seconds() / 3600, 2) if expiry else None
+    if remaining is None:
+        state = "unknown"
+    elif remaining <= 0:
+        state = "expired"
+    elif remaining <= RENEW_WINDOW_HOURS:
+        state = "due"
+    else:
+        state = "ok"
+    return {'account': account, 'server_id': server_id_from_url(server_url), 'name': server_name,
+            'url': server_url, 'expire_time': expire_time, 'remaining_hours': remaining, 'state': state}
+
+
+def write_status(records, output_format='json', stream=None):
+    """以 JSON 或 CSV 输出服务器状态"""
+    stream = stream or sys.stdout
+    if output_format == 'csv':
+        writer = csv.DictWriter(stream, fieldnames=STATUS_FIELDS, lineterminator='\n')
+        writer.writeheader()
+        writer.writerows(records)
+    else:
+        json.dump(records, stream, ensure_ascii=False, indent=2)
+        stream.write('\n')
+
+
+def write_readme(readme_content):
+    """写入 README.md 文件"""
+    try:
+        with open('README.md', 'w', encoding='utf-8') as f:
+            f.write(readme_content)
+        print("✅ README.md 文件已生成")
+    except Exception as e:
+        print(f"❌ 生成 README.md 文件失败: {e}")
+
+# =====================================================================
+#                           通知分发
+# =====================================================================
+
+@dataclass
+class Notification:
+    """一个账号一次运行的通知内容"""
+    account: str
+    success: bool
+    results: list
+    timestamp: str
+    next_run_time: Optional[datetime] = None
+    
+    def to_dict(self):
+        return {
+            'account': self.account,
+            'success': self.success,
+            'timestamp': to_beijing_time(self.timestamp),
+            'next_run_time': self.next_run_time.isoformat() if self.next_run_time else None,
+            'results': [result_to_dict(result) for result in self.results],
+        }
+
+
+def render_notification_text(notifications):
+    """把一批通知渲染为 Telegram HTML 文本"""
+    lines = ["<b>🕹️GTX Gaming续期通知</b>",
+             f"📅执行时间：{html.escape(to_beijing_time(notifications[-1].timestamp))}"]
+    for notification in notifications:
+        lines.append("")
+        if notification.account:
+            icon = "✅" if notification.success else "❌"
+            lines.append(f"<b>👤账号：{html.escape(notification.account)} {icon}</b>")
+        for server_id, status, old_expire, new_expire, server_name in notification.results:
+            status_icon, status_text = STATUS_LABELS.get(status, STATUS_LABELS["failed"])
+            label = f"{server_name}({server_id})" if server_name else server_id
+            lines.append(f"🖥️{html.escape(label)}：{status_icon}{status_text}")
+            if old_expire:
+                lines.append(f"🕛️旧到期时间：{old_expire}")
+            if new_expire and new_expire != old_expire:
+                lines.append(f"🕡️新到期时间：{new_expire}")
+        if notification.next_run_time:
+            next_run = (notification.next_run_time.astimezone(timezone.utc) + timedelta(hours=8))
+            lines.append(f"⏰下次需要运行时间：{next_run.strftime('%Y-%m-%d %H:%M:%S')}")
+    if RUN_URL:
+        lines += ["", "📋 详细信息：",
+                  f'🔗 <a href="{html.escape(RUN_URL)}">查看运行日志</a>',
+                  f'📸 <a href="{html.escape(RUN_URL)}#artifacts">下载截图</a>']
+    return "\n".join(lines)
+
+
+def split_message(text, limit=TELEGRAM_MESSAGE_LIMIT):
+    """按行把长消息切分为不超过 limit 个字符的多条消息"""
+    chunks, current = [], ""
+    for line in text.split("\n"):
+        while len(line) > limit:
+            chunks.append(line[:limit])
+            line = line[limit:]
+        if current and len(current) + len(line) + 1 > limit:
+            chunks.append(current)
+            current = line
+        else:
+            current = f"{current}\n{line}" if current else line
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class NotificationSink:
+    """通知通道接口：send 接收一批已合并的通知"""
+    
+    name = "sink"
+    
+    def send(self, notifications):
+        raise NotImplementedError
+    
+    def close(self):
+        pass
+
+
+class HTTPNotificationSink(NotificationSink):
+    """基于 HTTP 的通知通道：复用 keep-alive 连接，处理限流并按退避间隔重试"""
+    
+    def __init__(self, url):
+        self.url = url
+        parsed = urllib.parse.urlsplit(url)
+        self.session = PanelHTTPSession(f"{parsed.scheme}://{parsed.netloc}", pool_size=2)
+    
+    def retry_after(self, response):
+        """限流时服务端要求的等待秒数"""
+        try:
+            return float(response.headers.get('Retry-After'))
+        except (TypeError, ValueError):
+            return None
+    
+    def post(self, payload):
+        """POST JSON，成功返回 True；429 按服务端要求等待，5xx 与网络错误按退避间隔重试"""
+        for attempt in range(1, RETRY_ATTEMPTS + 1):
+            delay = None
+            try:
+                response = self.session.request('POST', self.url, json_body=payload)
+            except Exception as e:
+                reason = f"{type(e).__name__}: {e}"
+            else:
+                if response.status < 400:
+                    return True
+                reason = f"HTTP {response.status}"
+                if response.status == 429:
+                    delay = self.retry_after(response)
+                elif response.status < 500:
+                    break
+            if attempt >= RETRY_ATTEMPTS:
+                break
+            delay = min(delay, RETRY_MAX_DELAY * 4) if delay is not None else backoff_delay(attempt)
+            print(f"🔁 {self.name} 通知第 {attempt} 次发送失败（{reason}），{delay:.1f}s 后重试...")
+            time.sleep(delay)
+        print(f"❌ {self.name} 通知发送失败: {reason}")
+        return False
+    
+    def close(self):
+        self.session.close()
+
+
+class TelegramSink(HTTPNotificationSink):
+    """Telegram Bot API（或兼容接口）通知通道"""
+    
+    name = "Telegram"
+    
+    def __init__(self, token=TELEGRAM_BOT_TOKEN, chat_id=TELEGRAM_CHAT_ID, api_base=TELEGRAM_API_BASE):
+        super().__init__(f"{api_base}/bot{token}/sendMessage")
+        self.chat_id = chat_id
+    
+    def retry_after(self, response):
+        data = response.json() or {}
+        retry_after = (data.get('parameters') or {}).get('retry_after')
+        return float(retry_after) if retry_after is not None else super().retry_after(response)
+    
+    def send(self, notifications):
+        for chunk in split_message(render_notification_text(notifications)):
+            self.post({'chat_id': self.chat_id, 'text': chunk, 'parse_mode': 'HTML',
+                       'disable_web_page_preview': True})
+
+
+class WebhookSink(HTTPNotificationSink):
+    """通用 Webhook 通知通道：POST 结构化 JSON"""
+    
+    name = "Webhook"
+    
+    def send(self, notifications):
+        self.post({'text': render_notification_text(notifications), 'run_url': RUN_URL,
+                   'notifications': [notification.to_dict() for notification in notifications]})
+
+
+class FileSink(NotificationSink):
+    """本地文件通知通道：每批通知追加一行 JSON，便于测试"""
+    
+    name = "File"
+    
+    def __init__(self, path=NOTIFY_FILE):
+        self.path = path
+    
+    def send(self, notifications):
+        record = {'text': render_notification_text(notifications),
+                  'notifications': [notification.to_dict() for notification in notifications]}
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+
+def build_notification_sinks():
+    """根据环境变量创建已配置的通知通道"""
+    sinks = []
+    if TELEGRAM_BOT_TOKEN and TELEGRAM_CHAT_ID:
+        sinks.append(TelegramSink())
+    if NOTIFY_WEBHOOK_URL:
+        sinks.append(WebhookSink(NOTIFY_WEBHOOK_URL))
+    if NOTIFY_FILE:
+        sinks.append(FileSink())
+    return sinks
+
+
+class Notifier:
+    """通知分发：后台线程合并时间窗口内的通知后发往各个通道，不阻塞续期流程（线程安全）"""
+    
+    def __init__(self, sinks=None, mode=NOTIFY_MODE, coalesce_seconds=NOTIFY_COALESCE_SECONDS):
+        self.sinks = build_notification_sinks() if sinks is None else sinks
+        self.mode = mode
+        self.coalesce_seconds = coalesce_seconds
+        self.sent = 0
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+    
+    @property
+    def enabled(self):
+        return self.mode != 'off' and bool(self.sinks)
+    
+    def publish(self, notification):
+        """提交一个通知；changes 模式下只保留续期成功、失败或被延后的服务器，没有变化时不发送"""
+        if not self.enabled:
+            return
+        if self.mode == 'changes':
+            notification.results = [result for result in notification.results
+                                    if result[1] in ("success", "failed", "deferred")]
+            if not notification.results:
+                return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._dispatch, name="notifier", daemon=True)
+                self._thread.start()
+        self._queue.put(notification)
+    
+    def _dispatch(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            # 合并窗口内陆续到达的通知（多账号摘要合并为尽量少的消息）
+            deadline = time.monotonic() + self.coalesce_seconds
+            while True:
+                try:
+                    item = self._queue.get(timeout=max(0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._send(batch)
+    
+    def _send(self, batch):
+        for sink in self.sinks:
+            try:
+                sink.send(batch)
+            except Exception as e:
+                print(f"❌ {sink.name} 通知发送失败: {e}")
+        self.sent += len(batch)
+    
+    def close(self, timeout=60):
+        """发送剩余通知并释放连接"""
+        with self._lock:
+            thread = self._thread
+        if thread is not None:
+            self._queue.put(None)
+            thread.join(timeout)
+            if self.sent:
+                print(f"📨 已发送 {self.sent} 条通知")
+        for sink in self.sinks:
+            sink.close()
+
 # =====================================================================
 #                    GTX Gaming 自动续期主类
 # =====================================================================
@@ -43,12 +2463,40 @@ SCREENSHOT_ENABLED = True  # 是否启用截图功能
 class GTXGamingRenewer:
     """GTX Gaming 自动续期主类"""
     
-    def __init__(self):
-        """初始化续期器"""
+    def __init__(self, account=None, shared_browser=None):
+        """初始化续期器
+
+        account: 账号配置（见 normalize_account），默认使用环境变量中的账号
+        shared_browser: 多账号模式下共用的 SharedBrowser，本实例只创建独立的浏览器上下文
+        """
+        self.account = account or default_account()
+        self.account_name = self.account['name']
+        self.session_cache_file = session_cache_path(self.account_name)
+        self.shared_browser = shared_browser
         self.browser = None
         self.context = None
         self.page = None
+        self.playwright = None
+        self.http_engine = None
+        self.seed_storage_state = None  # 并发工作者复用的已登录会话
+        self.session_from_cache = False  # 浏览器上下文是否载入了会话缓存
+        self.resource_blocker = ResourceBlocker() if RESOURCE_BLOCKING else None
+        self.screenshots = ScreenshotManager()
+        self.tracer = Tracer(account=self.account_name)
+        self.memory = MemoryGovernor()
+        self.selectors = SelectorRegistry()
+        self.leases = None  # 节点间共享的租约库（LEASE_DB）
+        self.budget = None  # 全局运行时间预算（RUN_BUDGET_SECONDS）
+        self.run_started_at = None  # 整次运行的开始时间（time.time()），进程池工作进程由主进程传入
+        self.deferred = []  # 被延后的服务器 (server_id, 名称, 上次到期时间, 原因)，并发工作者共享
+        self.state_store = None  # 最近一次 plan_tasks 读取的服务器状态（上次到期时间等）
+        self.servers_on_page = 0  # 当前页面已处理的服务器数量
+        self.browser_slots = None  # 并发工作线程共享的浏览器名额，主工作者为 None（总是可以使用浏览器）
+        self.holds_browser_slot = False
         self.server_results = []
+        self.next_run_time = None  # 被跳过服务器中最早需要再次运行的时间
+        self.history_run_id = None  # 本次运行在运行历史中的 ID
+        self.inventory = ServerInventory(self.account['servers'], self.account.get('servers_file', ""))
         
     # =================================================================
     #                       1. 配置验证模块
@@ -56,12 +2504,12 @@ class GTXGamingRenewer:
     
     def validate_config(self):
         """验证配置"""
-        if not (REMEMBER_WEB_COOKIE or (LOGIN_EMAIL and LOGIN_PASSWORD)):
+        if not (self.account['remember_web_cookie'] or (self.account['email'] and self.account['password'])):
             raise ValueError("请设置 REMEMBER_WEB_COOKIE 或 LOGIN_EMAIL + LOGIN_PASSWORD")
         
         server_configs = self.get_server_configs()
         if not server_configs:
-            raise ValueError("请设置 SERVER_LIST 环境变量")
+            raise ValueError("请设置 SERVER_LIST_FILE 或 SERVER_LIST 环境变量")
             
         print("✅ 配置验证通过")
         return True
@@ -70,56 +2518,144 @@ class GTXGamingRenewer:
     #                       2. 浏览器初始化模块
     # =================================================================
     
-    def init_browser(self):
-        """初始化浏览器"""
+    def init_browser(self, storage_state=None):
+        """初始化浏览器
+
+        storage_state: 可选的会话状态（Cookie + 本地存储），用于并发工作线程复用已登录会话；
+                       未指定时尝试载入磁盘上的会话缓存
+        """
+        if storage_state is None:
+            storage_state = load_session_cache(self.session_cache_file)
+            self.session_from_cache = storage_state is not None
         try:
-            self.playwright = sync_playwright().start()
-            self.browser = self.playwright.chromium.launch(headless=HEADLESS)
-            self.page = self.browser.new_page()
+            with self.tracer.span('init_browser'):
+                self._launch_browser(storage_state)
             print("✅ 浏览器初始化成功")
         except Exception as e:
             print(f"❌ 浏览器初始化失败: {e}")
             raise
     
+    def _launch_browser(self, storage_state):
+        """启动（或复用共用的）浏览器并创建上下文与页面"""
+        if self.shared_browser is not None:
+            self.browser = self.shared_browser.get()
+        else:
+            self.playwright = playwright_api().sync_playwright().start()
+            self.browser = self.playwright.chromium.launch(headless=HEADLESS)
+            self.memory.browser_opened()
+        self._open_context(storage_state)
+    
+    def _open_context(self, storage_state):
+        """创建浏览器上下文与页面"""
+        self.context = self.browser.new_context(storage_state=storage_state)
+        if self.resource_blocker is not None:
+            self.resource_blocker.attach(self.context)
+        if TRACE_SLOW_SECONDS > 0:
+            self.context.tracing.start(screenshots=True, snapshots=True)
+        self.page = self.context.new_page()
+        self.servers_on_page = 0
+    
+    def recycle_page(self, kind='page'):
+        """回收页面（kind='page'）或整个上下文（kind='context'），会话通过 storage_state 延续"""
+        rss_before = None
+        if kind == 'context':
+            rss_before = self.memory.browser_rss
+            storage_state = self.context.storage_state()
+            if TRACE_SLOW_SECONDS > 0:
+                self.context.tracing.stop()
+            self.page.close()
+            self.context.close()
+            self._open_context(storage_state)
+            print("♻️ 已重建浏览器上下文（内存超过上限）")
+        else:
+            old_page = self.page
+            self.page = self.context.new_page()
+            old_page.close()
+            self.servers_on_page = 0
+            print(f"♻️ 已重建页面（已处理 {self.memory.recycle_servers} 个服务器）")
+        self.memory.recycled(kind, rss_before)
+    
     # =================================================================
     #                       3. 登录验证模块
     # =================================================================
     
     def login_to_panel(self):
         """登录到 GTX Gaming 控制面板"""
-        # 优先尝试 Cookie 登录
-        if REMEMBER_WEB_COOKIE:
+        # 优先复用缓存会话
+        if self.session_from_cache:
+            if self._validate_cached_session():
+                return True
+            print("🔄 缓存会话已失效，重新登录...")
+        
+        # 尝试 Cookie 登录
+        if self.account['remember_web_cookie']:
             if self._login_with_cookie():
+                self._save_session()
                 return True
             print("🔄 Cookie 登录失败，尝试邮箱密码登录...")
         
         # 邮箱密码登录
-        if LOGIN_EMAIL and LOGIN_PASSWORD:
-            return self._login_with_credentials()
+        if self.account['email'] and self.account['password']:
+            if self._login_with_credentials():
+                self._save_session()
+                return True
+            return False
         
         print("❌ 所有登录方式都失败")
         return False
     
+    def _validate_cached_session(self):
+        """通过客户端 API 轻量校验缓存会话，无需渲染页面"""
+        try:
+            print("💾 尝试复用缓存会话...")
+            response = self.context.request.get(
+                BASE_URL + AUTH_CHECK_PATH,
+                headers={'Accept': 'application/json', 'X-Requested-With': 'XMLHttpRequest'},
+                max_redirects=0,
+                timeout=15000,
+            )
+            if response.status == 200:
+                print("✅ 缓存会话有效")
+                return True
+            # 429/5xx 只说明面板暂时不可用，不能据此判定会话失效
+            rejected = not is_transient_response(response)
+        except Exception as e:
+            print(f"⚠️ 校验缓存会话异常: {e}")
+            rejected = False
+        
+        self.context.clear_cookies()
+        if rejected:
+            invalidate_session_cache(self.session_cache_file)
+        self.session_from_cache = False
+        return False
+    
+    def _save_session(self):
+        """登录成功后缓存浏览器会话"""
+        try:
+            save_session_cache(self.context.storage_state(), self.session_cache_file)
+        except Exception as e:
+            print(f"⚠️ 获取浏览器会话状态失败: {e}")
+    
     def _login_with_cookie(self):
         """使用 Cookie 登录"""
         try:
             print("🍪 尝试使用 Cookie 登录...")
             
             # 设置 Cookie
-            session_cookie = Cookie(
-                name='remember_web_59ba36addc2b2f9401580f014c7f58ea4e30989d',
-                value=REMEMBER_WEB_COOKIE,
-                domain='.gtxgaming.co.uk',
+            session_cookie = playwright_api().Cookie(
+                name=REMEMBER_WEB_COOKIE_NAME,
+                value=self.account['remember_web_cookie'],
+                domain=COOKIE_DOMAIN,
                 path='/',
                 expires=time.time() + 3600 * 24 * 365,
                 httpOnly=True,
-                secure=True,
+                secure=BASE_URL.startswith('https'),
                 sameSite='Lax'
             )
             self.page.context.add_cookies([session_cookie])
             
-            # 测试登录状态
-            self.page.goto(HOME_URL, wait_until="networkidle", timeout=60000)
+            # 测试登录状态（导航超时单独重试，被重定向到登录页则不重试）
+            with_retries("访问首页", lambda: self.page.goto(HOME_URL, wait_until="networkidle", timeout=60000))
             
             if "login" not in self.page.url and "auth" not in self.page.url:
                 print("✅ Cookie 登录成功")
@@ -138,11 +2674,11 @@ class GTXGamingRenewer:
         try:
             print("📧 尝试使用邮箱密码登录...")
             
-            self.page.goto(LOGIN_URL, wait_until="networkidle", timeout=60000)
+            with_retries("访问登录页", lambda: self.page.goto(LOGIN_URL, wait_until="networkidle", timeout=60000))
             
             # 填写登录表单
-            self.page.fill('input[name="email"]', LOGIN_EMAIL)
-            self.page.fill('input[name="password"]', LOGIN_PASSWORD)
+            self.page.fill('input[name="email"]', self.account['email'])
+            self.page.fill('input[name="password"]', self.account['password'])
             self.page.click('button[type="submit"]')
             
             # 等待登录完成
@@ -152,34 +2688,58 @@ class GTXGamingRenewer:
             
         except Exception as e:
             print(f"❌ 邮箱密码登录失败: {e}")
-            if SCREENSHOT_ENABLED:
-                print("📸 保存登录失败截图: login_failed.png")
-                self.page.screenshot(path="login_failed.png", full_page=True)
+            self.screenshots.capture(self.page, "login", "failed", is_error=True)
             return False
     
     # =================================================================
     #                       4. 到期时间获取模块
     # =================================================================
     
-    def get_server_expire_time(self):
+    def probe_page_state(self, wait_for_expiry=False):
+        """一次 evaluate 调用读取页面状态；wait_for_expiry 为真时在到期时间元素缺失时等待其出现"""
+        args = {
+            'expirySelectors': self.selectors.ordered('expiry'),
+            'buttonSelectors': self.selectors.ordered('renew_button'),
+            'errorSelectors': self.selectors.ordered('already_extended'),
+            'keywords': ALREADY_EXTENDED_KEYWORDS,
+        }
+        snapshot = PageSnapshot.from_probe(self.page.evaluate(PAGE_PROBE_SCRIPT, args))
+        if wait_for_expiry and snapshot.expiry_text is None:
+            try:
+                self.page.wait_for_function(EXPIRY_WAIT_SCRIPT,
+                                            arg={'selectors': args['expirySelectors'], 'oldValue': None},
+                                            timeout=self.selectors.timeout('expiry'))
+            except playwright_api().TimeoutError:
+                pass
+            else:
+                snapshot = PageSnapshot.from_probe(self.page.evaluate(PAGE_PROBE_SCRIPT, args))
+        
+        self.selectors.record('expiry', snapshot.expiry_selector)
+        # 没有续期按钮但显示了已续期提示属于正常情况，不计为落空
+        if snapshot.button_present or not snapshot.already_extended:
+            self.selectors.record('renew_button', snapshot.button_selector)
+        if snapshot.error_selector:
+            self.selectors.record('already_extended', snapshot.error_selector)
+        return snapshot
+    
+    def get_server_expire_time(self, snapshot=None):
         """获取服务器到期时间"""
         try:
             print("🔍 正在获取服务器到期时间...")
             
-            element = self.page.wait_for_selector('p:has-text("Expiry Date")', timeout=5000)
-            if not element or not element.is_visible():
+            if snapshot is None:
+                snapshot = self.probe_page_state(wait_for_expiry=True)
+            if snapshot.expiry_text is None or not snapshot.expiry_visible:
                 print("❌ 未找到到期时间元素")
                 return None
             
-            text_content = element.text_content().strip()
+            text_content = snapshot.expiry_text
             print(f"🎯 找到到期时间元素: {text_content}")
             
             # 使用正则表达式提取时间格式 YYYY-MM-DD HH:MM:SS
-            pattern = r'\d{4}-\d{2}-\d{2}\s+\d{2}:\d{2}:\d{2}'
-            match = re.search(pattern, text_content)
+            expire_time = parse_expire_time(text_content)
             
-            if match:
-                expire_time = match.group()
+            if expire_time:
                 print(f"✅ 成功获取到期时间: {expire_time}")
                 return expire_time
             else:
@@ -194,27 +2754,12 @@ class GTXGamingRenewer:
     #                       5. 错误检测模块
     # =================================================================
     
-    def check_already_extended_error(self):
+    def check_already_extended_error(self, snapshot=None):
         """检查页面是否显示已经续期过的错误提示"""
         try:
-            error_selectors = [
-                '.alert.alert-danger',
-                '.error-message', 
-                '.form-error',
-                '[role="alert"]',
-                'div:has-text("already extended")',
-                'div:has-text("once per day")',
-                'div:has-text("You have already extended")'
-            ]
-            
-            for selector in error_selectors:
-                element = self.page.query_selector(selector)
-                if element:
-                    error_text = element.inner_text().strip().lower()
-                    keywords = ['already extended', 'once per day', 'you have already', '已经续期', '每天只能']
-                    if any(keyword in error_text for keyword in keywords):
-                        return True
-            return False
+            if snapshot is None:
+                snapshot = self.probe_page_state()
+            return snapshot.already_extended
         except Exception:
             return False
     
@@ -224,73 +2769,123 @@ class GTXGamingRenewer:
     
     def extend_server_time(self, server_url, server_name=""):
         """为指定服务器延长时间"""
-        server_display_name = server_name or server_url.split('/')[-1]
-        server_id = server_url.split('/')[-1]
+        server_id = server_id_from_url(server_url)
+        if TRACE_SLOW_SECONDS > 0:
+            self.context.tracing.start_chunk(title=server_id)
+        started = time.perf_counter()
+        with self.tracer.span('browser_renew', server_id=server_id) as span:
+            result = self._extend_server_time(server_url, server_name)
+            span['outcome'] = result[1]
+        if TRACE_SLOW_SECONDS > 0:
+            self._stop_playwright_trace(server_id, time.perf_counter() - started)
+        return result
+    
+    def _stop_playwright_trace(self, server_id, elapsed):
+        """结束 Playwright trace 分段，只保留慢速服务器的记录"""
+        try:
+            if elapsed >= TRACE_SLOW_SECONDS:
+                path = f"trace_{server_id}.zip"
+                self.context.tracing.stop_chunk(path=path)
+                print(f"🐢 服务器 {server_id} 耗时 {elapsed:.1f}s，已保存 Playwright trace: {path}")
+            else:
+                self.context.tracing.stop_chunk()
+        except Exception as e:
+            print(f"⚠️ 保存 Playwright trace 失败: {e}")
+    
+    def _navigate(self, server_url, server_id):
+        """导航到服务器页面并记录导航耗时；超时按观测到的页面加载耗时自适应调整，失败时重试"""
+        host = urllib.parse.urlsplit(server_url).hostname
+        latency = get_adaptive_timeout(host, 'goto')
+        breaker = get_circuit_breaker(host)
+        
+        def goto():
+            started = time.perf_counter()
+            try:
+                response = self.page.goto(server_url, wait_until="networkidle", timeout=latency.timeout() * 1000)
+            except Exception:
+                breaker.record(False)
+                raise
+            latency.observe(time.perf_counter() - started)
+            breaker.record(response is None or not is_transient_response(response))
+        
+        with self.tracer.span('goto', server_id=server_id) as span:
+            with_retries("访问服务器页面", goto)
+            try:
+                span['navigation'] = self.page.evaluate(NAVIGATION_TIMING_SCRIPT)
+            except Exception:
+                pass
+    
+    def _capture(self, server_id, kind, is_error=False):
+        """截图并记录耗时"""
+        if self.screenshots.enabled:
+            with self.tracer.span('screenshot', server_id=server_id, kind=kind):
+                self.screenshots.capture(self.page, server_id, kind, is_error=is_error)
+    
+    def _extend_server_time(self, server_url, server_name=""):
+        """为指定服务器延长时间（浏览器流程）"""
+        server_id = server_id_from_url(server_url)
+        server_display_name = server_name or server_id
         
         print(f"\n=== 正在处理服务器: {server_display_name} ===")
         
         try:
             # 导航到服务器页面
             print(f"正在访问服务器页面: {server_url}")
-            self.page.goto(server_url, wait_until="networkidle", timeout=60000)
-            time.sleep(3)  # 等待页面完全加载
+            self._navigate(server_url, server_id)
             
             # 检查是否成功到达服务器页面
             if "login" in self.page.url or "auth" in self.page.url:
                 print(f"❌ 访问服务器失败，会话可能已过期")
                 return self._create_result(server_id, "failed", server_name)
             
+            # 一次探测获取到期时间、按钮状态与错误提示
+            with self.tracer.span('probe', server_id=server_id):
+                snapshot = with_retries("读取页面状态",
+                                        lambda: self.probe_page_state(wait_for_expiry=True),
+                                        should_retry=lambda snap: not (snap.expiry_text or snap.button_present or snap.error_texts))
+            
             # 获取续期前的到期时间
-            old_expire_time = self.get_server_expire_time()
+            old_expire_time = self.get_server_expire_time(snapshot)
             if old_expire_time:
                 print(f"📅 续期前到期时间: {old_expire_time}")
             
             # 续期前截图
-            if SCREENSHOT_ENABLED:
-                before_screenshot = f"{server_id}_before.png"
-                print(f"📸 保存续期前截图: {before_screenshot}")
-                self.page.screenshot(path=before_screenshot, full_page=True)
+            self._capture(server_id, "before")
             
             # 执行续期操作
-            renew_result = self._perform_renew_action()
+            with self.tracer.span('renew_click', server_id=server_id) as span:
+                renew_result = self._perform_renew_action(snapshot)
+                span['outcome'] = renew_result
             
             if renew_result == "success":
                 # 获取续期后的到期时间
-                new_expire_time = self._get_new_expire_time(old_expire_time)
+                with self.tracer.span('expiry_update', server_id=server_id):
+                    new_expire_time = self._get_new_expire_time(old_expire_time)
                 
                 # 续期后截图
-                if SCREENSHOT_ENABLED:
-                    after_screenshot = f"{server_id}_after.png"
-                    print(f"📸 保存续期后截图: {after_screenshot}")
-                    self.page.screenshot(path=after_screenshot, full_page=True)
+                self._capture(server_id, "after")
                 
                 return self._create_result(server_id, "success", server_name, old_expire_time, new_expire_time)
             else:
                 # 如果续期失败或已续期，也保存一张截图作为记录
-                if SCREENSHOT_ENABLED:
-                    status_screenshot = f"{server_id}_status.png"
-                    print(f"📸 保存状态截图: {status_screenshot}")
-                    self.page.screenshot(path=status_screenshot, full_page=True)
+                self._capture(server_id, "status", is_error=renew_result == "failed")
                 
                 return self._create_result(server_id, renew_result, server_name, old_expire_time)
                 
         except Exception as e:
             print(f"❌ 处理服务器 {server_display_name} 时发生错误: {e}")
-            if SCREENSHOT_ENABLED:
-                error_screenshot = f"{server_id}_error.png"
-                print(f"📸 保存错误截图: {error_screenshot}")
-                self.page.screenshot(path=error_screenshot, full_page=True)
+            self._capture(server_id, "error", is_error=True)
             return self._create_result(server_id, "failed", server_name)
     
-    def _perform_renew_action(self):
+    def _perform_renew_action(self, snapshot=None):
         """执行续期按钮点击操作"""
-        add_button_selector = 'button:has-text("EXTEND 72 HOUR(S)")'
         print("🔍 正在查找续期按钮...")
+        if snapshot is None:
+            snapshot = self.probe_page_state()
         
         # 检查按钮是否存在
-        button_element = self.page.query_selector(add_button_selector)
-        if not button_element:
-            if self.check_already_extended_error():
+        if not snapshot.button_present:
+            if self.check_already_extended_error(snapshot):
                 print("ℹ️ 服务器已经续期过了")
                 return "already_extended"
             else:
@@ -298,32 +2893,34 @@ class GTXGamingRenewer:
                 return "failed"
         
         # 检查按钮是否可点击
-        if button_element.is_disabled():
+        if snapshot.button_disabled:
             print("ℹ️ 续期按钮已禁用（可能已续期）")
             return "already_extended"
         
         # 点击续期按钮
         try:
             print("🖱️ 点击续期按钮...")
-            self.page.wait_for_selector(add_button_selector, state='visible', timeout=10000)
             
-            # 监听网络响应
-            responses = []
-            def handle_response(response):
-                if "/api/client/freeservers/" in response.url or "renew" in response.url.lower():
-                    responses.append(response)
+            # 点击并等待续期接口响应，收到响应即继续，无需固定等待；只有点击本身失败时才重试
+            def click_and_wait():
+                clicked = False
+                try:
+                    with self.page.expect_response(self._is_renew_response,
+                                                   timeout=RENEW_RESPONSE_TIMEOUT) as response_info:
+                        self.page.click(snapshot.button_selector or RENEW_BUTTON_SELECTOR,
+                                        timeout=SELECTOR_WAIT_TIMEOUT)
+                        clicked = True
+                    return [response_info.value]
+                except playwright_api().TimeoutError:
+                    if not clicked:
+                        raise
+                    print(f"⚠️ {RENEW_RESPONSE_TIMEOUT // 1000} 秒内未捕获到续期接口响应")
+                    return []
             
-            self.page.on("response", handle_response)
+            responses = with_retries("点击续期按钮", click_and_wait)
             
-            try:
-                button_element.click()
-                time.sleep(5)  # 等待响应
-                
-                # 检查响应结果
-                return self._check_renew_response(responses)
-                
-            finally:
-                self.page.remove_listener("response", handle_response)
+            # 检查响应结果
+            return self._check_renew_response(responses)
                 
         except Exception as e:
             print(f"❌ 续期按钮操作失败: {e}")
@@ -331,6 +2928,10 @@ class GTXGamingRenewer:
                 return "already_extended"
             return "failed"
     
+    def _is_renew_response(self, response):
+        """判断是否为续期接口的响应"""
+        return "/api/client/freeservers/" in response.url or "renew" in response.url.lower()
+    
     def _check_renew_response(self, responses):
         """检查续期响应结果"""
         for response in responses:
@@ -355,7 +2956,17 @@ class GTXGamingRenewer:
     def _get_new_expire_time(self, old_expire_time):
         """获取续期后的新到期时间"""
         print("🔄 获取续期后的新到期时间...")
-        time.sleep(3)  # 等待页面更新
+        
+        # 等待到期时间文本从旧值变化，而不是固定等待页面更新
+        if old_expire_time:
+            try:
+                self.page.wait_for_function(
+                    EXPIRY_WAIT_SCRIPT,
+                    arg={'selectors': self.selectors.ordered('expiry'), 'oldValue': old_expire_time},
+                    timeout=EXPIRE_UPDATE_TIMEOUT,
+                )
+            except playwright_api().TimeoutError:
+                print(f"⚠️ {EXPIRE_UPDATE_TIMEOUT // 1000} 秒内到期时间未变化")
         
         new_expire_time = self.get_server_expire_time()
         if new_expire_time:
@@ -373,175 +2984,962 @@ class GTXGamingRenewer:
         """创建处理结果"""
         return (server_id, status, old_expire, new_expire, server_name)
     
+    def _defer(self, server_id, server_name, reason):
+        """记录延后原因并返回延后结果（带上次记录的到期时间）"""
+        last_expiry = self.state_store.get(server_id).get('last_expiry') if self.state_store else None
+        self.deferred.append((server_id, server_name, last_expiry, reason))
+        return self._create_result(server_id, "deferred", server_name, last_expiry)
+    
+    def report_deferred(self):
+        """列出被延后的服务器及原因"""
+        if not self.deferred:
+            return
+        print(f"\n=== ⏳ 延后 {len(self.deferred)} 个服务器 ===")
+        for server_id, server_name, last_expiry, reason in self.deferred:
+            print(f"⏳ {server_name or server_id}：上次记录到期时间 {last_expiry or '未知'}，{reason}")
+    
     # =================================================================
     #                       7. 工具函数模块
     # =================================================================
     
     def get_server_configs(self):
-        """从环境变量中获取服务器配置"""
-        server_list_env = os.environ.get('SERVER_LIST')
-        if not server_list_env:
-            print("❌ 未找到 SERVER_LIST 环境变量")
-            print("💡 请设置 SERVER_LIST 环境变量以配置您的服务器列表")
-            return []
-        
-        try:
-            server_configs = json.loads(server_list_env)
-            print(f"从 SERVER_LIST 环境变量读取到 {len(server_configs)} 个服务器配置")
-            return server_configs
-        except json.JSONDecodeError as e:
-            print(f"❌ 解析 SERVER_LIST JSON 格式失败: {e}")
-            print("💡 请检查 JSON 格式是否正确")
-            return []
+        """从账号配置、清单文件或环境变量中获取服务器配置（解析结果缓存，多次调用不重复解析）"""
+        return self.inventory.load()
     
     def generate_readme(self, timestamp):
-        """生成 README.md 文件"""
-        # 转换为北京时间（UTC+8）
+        """生成 README.md 文件：已写入运行历史时从历史库渲染结果与趋势"""
+        readme_content = render_readme_header(timestamp, self.next_run_time)
+        history = RunHistoryStore.open() if self.history_run_id else None
+        if history is None:
+            readme_content += render_server_results(self.server_results)
+        else:
+            try:
+                readme_content += render_server_results(history.run_results(self.history_run_id))
+                readme_content += render_history_trends(history.trends(self.account_name))
+            finally:
+                history.close()
+        write_readme(readme_content)
+    
+    # =================================================================
+    #                       8. 批量处理模块
+    # =================================================================
+    
+    def build_tasks(self, servers):
+        """把规范化后的服务器（ServerInventory.load / iter_servers 的输出）转换为 (server_url, server_name) 任务列表"""
+        return [(server['url'], server['name']) for server in servers]
+    
+    def plan_tasks(self, tasks):
+        """按续期计划拆分任务，返回 (需要处理的 [(index, task)], 跳过结果 {index: result})"""
+        store = self.state_store = ServerStateStore()
+        due, skipped, self.next_run_time = RenewalPlanner(store).plan(tasks)
+        skipped_results = {}
+        for index, (server_url, server_name), due_time in skipped:
+            server_id = server_id_from_url(server_url)
+            local_due = due_time.astimezone(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+            print(f"⏭️ 跳过服务器 {server_name or server_id}：未进入续期窗口，下次处理时间 {local_due} UTC")
+            skipped_results[index] = self._create_result(
+                server_id, "skipped", server_name, store.get(server_id).get('last_expiry'))
+        return due, skipped_results
+    
+    def record_results(self, results):
+        """把本次处理结果写入服务器状态文件（加文件锁，多账号多进程并发写入时不丢失记录）"""
+        if not SERVER_STATE_FILE:
+            return
+        with open(SERVER_STATE_FILE + '.lock', 'w') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            store = ServerStateStore()
+            for result in results:
+                if result[1] not in ("skipped", "deferred"):
+                    store.record(result)
+            store.save()
+    
+    def estimate_server_seconds(self):
+        """单个服务器的初始耗时估计（取运行历史），没有历史时返回 None"""
+        history = RunHistoryStore.open()
+        if history is not None:
+            try:
+                average = history.average_server_seconds(self.account_name)
+            except sqlite3.Error:
+                average = None
+            finally:
+                history.close()
+            return average
+        return None
+    
+    def record_history(self, results, started_at):
+        """把本次运行的结果与各阶段耗时追加写入运行历史，返回运行 ID"""
+        history = RunHistoryStore.open()
+        if history is None:
+            return None
         try:
-            utc_time = datetime.strptime(timestamp, '%Y-%m-%d %H:%M:%S')
-            beijing_time = utc_time + timedelta(hours=8)
-            beijing_timestamp = beijing_time.strftime('%Y-%m-%d %H:%M:%S')
-        except:
-            beijing_timestamp = timestamp
+            return history.record_run(self.account_name, started_at, results,
+                                      durations=self.tracer.server_durations())
+        except sqlite3.Error as e:
+            print(f"⚠️ 写入运行历史失败: {e}")
+            return None
+        finally:
+            history.close()
+    
+    def process_servers(self, tasks):
+        """批量处理服务器，返回与输入顺序一致的结果列表"""
+        if CONCURRENCY > 1 and len(tasks) > 1:
+            return self._process_servers_concurrently(tasks)
         
-        readme_content = f"**最后运行时间**: `{beijing_timestamp}`\n\n"
-        readme_content += f"**运行结果**: <br>\n"
+        return [self.renew_server(server_url, server_name)
+                for server_url, server_name in tasks]
+    
+    def renew_server(self, server_url, server_name="", browser_only=False):
+        """续期单个服务器：优先 HTTP 引擎，无法确认结果时回退到浏览器；启用租约时先认领
+
+        并发工作线程没有浏览器名额而需要回退时返回 None，由主工作者以 browser_only=True 重新处理。
+        """
+        server_id = server_id_from_url(server_url)
+        if self.budget is not None and not self.budget.admit():
+            return self._defer(server_id, server_name, self.budget.shortfall())
+        if self.leases is not None and not self.leases.claim(server_id):
+            if self.budget is not None:
+                self.budget.release()
+            print(f"🔒 服务器 {server_name or server_id} 已由其他节点认领，跳过")
+            return self.leases.result_for(server_id) or self._create_result(server_id, "skipped", server_name)
         
-        for i, result in enumerate(self.server_results):
-            server_id, status, old_expire, new_expire, server_name = result
-            
-            # 状态图标和文本
-            status_map = {
-                "success": ("✅", "Success"),
-                "already_extended": ("ℹ️", "Unexpired"),
-                "failed": ("❌", "Failed")
-            }
-            status_icon, status_text = status_map.get(status, ("❌", "Failed"))
-            
-            # 生成服务器信息
-            if server_name:
-                readme_content += f"🖥️服务器ID：`{server_name}({server_id})`<br>"
-            else:
-                readme_content += f"🖥️服务器ID：`{server_id}`<br>"
-            
-            readme_content += f"📊续期结果：{status_icon}{status_text}<br>"
-            
-            # 添加到期时间信息
-            if old_expire:
-                readme_content += f"🕛️旧到期时间：`{old_expire}`"
-                # 如果有新到期时间，则添加<br>
-                if new_expire and new_expire != old_expire:
-                    readme_content += "<br>"
-            
-            if new_expire and new_expire != old_expire:
-                readme_content += f"🕡️新到期时间：`{new_expire}`"
-            
-            # 添加服务器之间的空行分隔
-            readme_content += "\n"
-            if i < len(self.server_results) - 1:
-                readme_content += "\n"
+        started, result = time.perf_counter(), None
+        try:
+            with self.tracer.span('server', server_id=server_id) as span:
+                result = self._renew_server(server_url, server_name, browser_only)
+                span['outcome'] = result[1] if result else 'handoff'
+        finally:
+            if self.budget is not None and (result is None or result[1] == "deferred"):
+                self.budget.release()  # 熔断延后或转交主工作者，不计入耗时估计
+            elif self.budget is not None:
+                self.budget.observe(time.perf_counter() - started)
+        if self.leases is not None and result is not None:
+            self.leases.complete(result)
+        return result
+    
+    def shard_tasks(self, tasks):
+        """只保留属于本节点分片的任务"""
+        if SHARD_COUNT <= 1:
+            return tasks
+        own = [task for task in tasks if shard_of(server_id_from_url(task[0])) == SHARD_INDEX]
+        print(f"🧩 分片 {SHARD_INDEX}/{SHARD_COUNT}：本节点负责 {len(own)}/{len(tasks)} 个服务器")
+        return own
+    
+    def _renew_server(self, server_url, server_name="", browser_only=False):
+        """续期单个服务器（不含埋点）
+
+        熔断器只由传输层（HTTP 请求与页面导航）的网络错误、超时和 429/5xx 驱动；
+        熔断期间不访问面板，服务器标记为延后，不写入状态文件，下次运行优先处理。
+        """
+        breaker = get_circuit_breaker(urllib.parse.urlsplit(server_url).hostname)
+        if not breaker.allow():
+            print(f"⛔ 面板熔断中，延后服务器: {server_name or server_id_from_url(server_url)}")
+            return self._defer(server_id_from_url(server_url), server_name, "面板熔断中")
+        return self._renew_server_once(server_url, server_name, browser_only)
+    
+    def _renew_server_once(self, server_url, server_name="", browser_only=False):
+        """HTTP 引擎优先，失败时回退到浏览器；没有浏览器名额时返回 None"""
+        if self.http_engine is not None and not browser_only:
+            with self.tracer.span('http_renew', server_id=server_id_from_url(server_url)) as span:
+                result = self.http_engine.extend_server(server_url, server_name)
+                span['outcome'] = result[1] if result else 'fallback'
+            if result is not None:
+                return result
+            if RENEW_ENGINE == 'http':
+                return self._create_result(server_id_from_url(server_url), "failed", server_name)
+            print("🔄 HTTP 续期未能确认结果，回退到浏览器...")
         
-        # 写入文件
+        if not self._acquire_browser_slot():
+            print("⏸️ 浏览器数量已达上限，转交主工作者用浏览器处理")
+            return None
         try:
-            with open('README.md', 'w', encoding='utf-8') as f:
-                f.write(readme_content)
-            print("✅ README.md 文件已生成")
+            self._ensure_browser()
         except Exception as e:
-            print(f"❌ 生成 README.md 文件失败: {e}")
+            print(f"❌ 浏览器回退不可用: {e}")
+            return self._create_result(server_id_from_url(server_url), "failed", server_name)
+        result = self.extend_server_time(server_url, server_name)
+        
+        # 内存治理：按处理数量或进程树 RSS 回收页面/上下文
+        self.servers_on_page += 1
+        decision = self.memory.decide(self.servers_on_page)
+        if decision:
+            try:
+                with self.tracer.span('recycle', kind=decision):
+                    self.recycle_page(decision)
+            except Exception as e:
+                print(f"⚠️ 回收页面失败: {e}")
+        return result
+    
+    def _acquire_browser_slot(self):
+        """并发工作线程启动浏览器前占用一个名额（不等待），已有浏览器或名额时返回 True"""
+        if self.page is not None or self.browser_slots is None or self.holds_browser_slot:
+            return True
+        self.holds_browser_slot = self.browser_slots.acquire(blocking=False)
+        return self.holds_browser_slot
+    
+    def _ensure_browser(self):
+        """按需启动浏览器并登录（已有会话状态时直接复用）"""
+        if self.page is not None:
+            return
+        print("🌐 初始化浏览器...")
+        self.init_browser(storage_state=self.seed_storage_state)
+        if self.seed_storage_state is None:
+            print("🔐 开始浏览器登录...")
+            with self.tracer.span('login_to_panel') as span:
+                # 只重试异常（导航超时等）；返回 False 说明登录信息被拒绝，重试只会重复提交凭据
+                logged_in = with_retries("浏览器登录", self.login_to_panel)
+                span['outcome'] = 'ok' if logged_in else 'failed'
+            if not logged_in:
+                raise RuntimeError("浏览器登录失败")
+    
+    def _process_servers_concurrently(self, tasks):
+        """并发处理服务器
+
+        当前线程作为一个工作者，其余工作线程共享 HTTP 引擎；需要浏览器时在 BROWSER_CONCURRENCY 名额内各自启动，
+        并通过 storage_state 共享登录会话，无需重复登录。没有名额的工作线程把需要浏览器的服务器转交给当前线程。
+        """
+        # 多账号模式下账号共用一个浏览器进程，工作线程不再另起浏览器
+        browser_limit = 1 if self.shared_browser is not None else BROWSER_CONCURRENCY
+        worker_count = min(CONCURRENCY, len(tasks))
+        if self.http_engine is None:
+            worker_count = min(worker_count, browser_limit)  # 浏览器引擎下每个工作者都需要浏览器
+        if worker_count <= 1:
+            return [self.renew_server(server_url, server_name) for server_url, server_name in tasks]
+        print(f"⚡ 并发模式：{worker_count} 个工作者处理 {len(tasks)} 个服务器")
+        
+        if self.context is not None:
+            storage_state = self.context.storage_state()
+        elif self.http_engine is not None:
+            storage_state = self.http_engine.session.storage_state()
+        else:
+            storage_state = None
+        task_queue = queue.Queue()
+        for index, task in enumerate(tasks):
+            task_queue.put((index, task))
+        results = [None] * len(tasks)
+        handoff = []  # 没有浏览器名额的工作线程转交的 (index, task)
+        browser_slots = threading.BoundedSemaphore(browser_limit - 1)
+        
+        def drain(renewer):
+            while True:
+                try:
+                    index, task = task_queue.get_nowait()
+                except queue.Empty:
+                    return
+                results[index] = renewer.renew_server(*task)
+                if results[index] is None:
+                    handoff.append((index, task))
+        
+        def worker():
+            # Playwright 同步 API 不能跨线程共享，每个线程持有独立的实例
+            renewer = GTXGamingRenewer(self.account)
+            renewer.http_engine = self.http_engine
+            renewer.seed_storage_state = storage_state
+            renewer.resource_blocker = self.resource_blocker
+            renewer.screenshots = self.screenshots
+            renewer.tracer = self.tracer
+            renewer.memory = self.memory
+            renewer.selectors = self.selectors
+            renewer.leases = self.leases
+            renewer.budget = self.budget
+            renewer.deferred = self.deferred
+            renewer.state_store = self.state_store
+            renewer.browser_slots = browser_slots
+            try:
+                drain(renewer)
+            except Exception as e:
+                print(f"❌ 并发工作线程异常: {e}")
+            finally:
+                renewer.close()
+                if renewer.holds_browser_slot:
+                    browser_slots.release()
+        
+        with ThreadPoolExecutor(max_workers=worker_count - 1,
+                                thread_name_prefix="renew-worker") as pool:
+            futures = [pool.submit(worker) for _ in range(worker_count - 1)]
+            drain(self)
+            for future in futures:
+                future.result()
+        
+        for index, (server_url, server_name) in handoff:
+            results[index] = self.renew_server(server_url, server_name, browser_only=True)
+        
+        # 工作线程异常退出时未处理的服务器记为失败
+        for index, (server_url, server_name) in enumerate(tasks):
+            if results[index] is None:
+                results[index] = self._create_result(server_id_from_url(server_url), "failed", server_name)
+        return results
     
     # =================================================================
-    #                       8. 资源清理模块
+    #                       9. 资源清理模块
     # =================================================================
     
     def close(self):
-        """关闭浏览器"""
+        """关闭浏览器（共用的浏览器进程由 SharedBrowser 负责关闭）"""
+        if self.context is None and self.playwright is None:
+            return
         try:
             if self.page:
                 self.page.close()
-            if self.browser:
-                self.browser.close()
-            if hasattr(self, 'playwright'):
+            if self.context:
+                self.context.close()
+            if self.playwright is not None:
+                if self.browser:
+                    self.browser.close()
                 self.playwright.stop()
-            print("✅ 浏览器已关闭")
+                self.memory.browser_closed()
+                print("✅ 浏览器已关闭")
         except Exception as e:
             print(f"❌ 关闭浏览器时发生错误: {e}")
     
     # =================================================================
-    #                       9. 主运行流程
+    #                       10. 主运行流程
     # =================================================================
     
+    def execute(self):
+        """执行续期流程（不生成报告、不释放资源），返回是否成功"""
+        started_at = datetime.now(timezone.utc)
+        
+        # 验证配置
+        self.validate_config()
+        
+        # 按续期计划筛选需要处理的服务器
+        server_configs = self.get_server_configs()
+        tasks = self.shard_tasks(self.build_tasks(server_configs))
+        due, skipped_results = self.plan_tasks(tasks)
+        due_results = {}
+        
+        if not due:
+            print("✅ 没有需要续期的服务器，跳过登录与浏览器启动")
+        else:
+            # 登录预检：启动浏览器之前先用 HTTP 请求确认登录信息，浏览器仅在需要时启动
+            print("🔐 开始登录...")
+            if not self.preflight_login():
+                return False
+            
+            if self.http_engine is None:
+                try:
+                    self._ensure_browser()
+                except Exception as e:
+                    print(f"❌ 登录失败，无法继续执行: {e}")
+                    return False
+            
+            print(f"✅ 登录成功！开始处理 {len(due)} 个服务器...")
+            self.leases = LeaseStore.open()
+            if RUN_BUDGET_SECONDS > 0:
+                self.budget = RunBudget(prior_seconds=self.estimate_server_seconds(),
+                                        started_at=self.run_started_at)
+                estimate = f"{self.budget.estimate:.1f}s" if self.budget.estimate else "未知"
+                print(f"⏱️ 运行时间预算: 剩余 {self.budget.remaining():.0f}s，"
+                      f"预计单个服务器 {estimate}，按到期时间从早到晚处理")
+            
+            # 处理每个服务器
+            results = self.process_servers([task for _, task in due])
+            due_results = {index: result for (index, _), result in zip(due, results)}
+            self.record_results(results)
+        
+        self.server_results = [due_results.get(index) or skipped_results[index]
+                               for index in range(len(tasks))]
+        self.history_run_id = self.record_history(self.server_results, started_at)
+        success_count = sum(1 for result in self.server_results
+                            if result[1] in ["success", "already_extended", "skipped"])
+        deferred_count = sum(1 for result in self.server_results if result[1] == "deferred")
+        if deferred_count:
+            # 被延后的服务器仍需尽快处理
+            self.next_run_time = datetime.now(timezone.utc)
+            self.report_deferred()
+        
+        if self.next_run_time:
+            print(f"⏰ 下次需要运行时间: {self.next_run_time.strftime('%Y-%m-%d %H:%M:%S %Z')}")
+        
+        # 显示总结
+        total_count = len(tasks)
+        print(f"\n=== 批量处理完成 ===")
+        print(f"总计: {total_count} 个服务器")
+        print(f"成功: {success_count} 个服务器")
+        print(f"失败: {total_count - success_count - deferred_count} 个服务器")
+        if deferred_count:
+            print(f"延后: {deferred_count} 个服务器")
+        
+        self.screenshots.flush()
+        self.screenshots.report()
+        
+        if self.resource_blocker is not None:
+            self.resource_blocker.report()
+        self.memory.report()
+        self.selectors.report()
+        if self.leases is not None:
+            self.leases.report()
+        
+        # 分片后本节点可能没有分到服务器，这不算失败
+        return success_count > 0 or not tasks
+    
+    def preflight_login(self):
+        """启动 Playwright 之前用 HTTP 建立会话，返回是否可以继续
+
+        HTTP 登录成功时：auto/http 模式直接使用 HTTP 引擎；browser 模式把会话交给浏览器上下文，省去浏览器登录。
+        只有会话校验被面板明确拒绝（401 或重定向到登录页）且没有可供浏览器尝试的邮箱密码时，
+        才不启动浏览器直接失败；网络错误、5xx 及其他无法判断的响应都交给浏览器登录再试。
+        """
+        self.http_engine = HTTPRenewEngine(self.account)
+        with self.tracer.span('http_login') as span:
+            logged_in = with_retries("HTTP 登录", self.http_engine.login,
+                                     should_retry=lambda ok: not ok and self.http_engine.unreachable)
+            span['outcome'] = 'ok' if logged_in else 'failed'
+        rejected = self.http_engine.rejected
+        
+        if logged_in and RENEW_ENGINE != 'browser':
+            return True
+        if logged_in:
+            self.seed_storage_state = self.http_engine.session.storage_state()
+        self.http_engine.close()
+        self.http_engine = None
+        if logged_in:
+            return True
+        
+        if RENEW_ENGINE == 'http':
+            print("❌ 登录失败，无法继续执行")
+            return False
+        if rejected and not (self.account['email'] and self.account['password']):
+            print("❌ Cookie 已失效（HTTP 预检），跳过浏览器启动")
+            return False
+        return True
+    
+    def shutdown(self):
+        """释放浏览器与 HTTP 会话，并等待截图写盘完成"""
+        self.screenshots.flush()
+        self.selectors.save()
+        self.close()
+        if self.http_engine is not None:
+            self.http_engine.close()
+        if self.leases is not None:
+            self.leases.close()
+            self.leases = None
+    
     def run(self):
         """运行主流程"""
         current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        notifier = Notifier()
+        success = False
         
         try:
             print("🚀 启动 GTX Gaming 自动续期脚本")
             print("=" * 50)
+            success = self.execute()
+            return success
             
-            # 验证配置
-            self.validate_config()
-            
-            # 初始化浏览器
-            print("🌐 初始化浏览器...")
-            self.init_browser()
-            
-            # 登录
-            print("🔐 开始登录...")
-            if not self.login_to_panel():
-                print("❌ 登录失败，无法继续执行")
-                return False
-            
-            print("✅ 登录成功！开始处理服务器列表...")
-            
-            # 处理每个服务器
-            server_configs = self.get_server_configs()
-            success_count = 0
-            
-            for config in server_configs:
-                server_url = config.get('url', '')
-                server_name = config.get('name', '')
-                
-                if not server_url:
-                    print(f"⚠️ 跳过无效的服务器配置: {config}")
-                    continue
-                
-                result = self.extend_server_time(server_url, server_name)
-                self.server_results.append(result)
-                
-                if result[1] in ["success", "already_extended"]:
-                    success_count += 1
-                
-                time.sleep(2)  # 间隔处理
-            
-            # 显示总结
-            total_count = len(server_configs)
-            print(f"\n=== 批量处理完成 ===")
-            print(f"总计: {total_count} 个服务器")
-            print(f"成功: {success_count} 个服务器")
-            print(f"失败: {total_count - success_count} 个服务器")
-            
-            if SCREENSHOT_ENABLED:
-                print(f"📸 截图已保存，每个服务器最多2张截图")
+        except Exception as e:
+            print(f"💥 运行时发生错误: {e}")
+            return False
+        finally:
+            # 生成报告，通知在后台发送
+            with self.tracer.span('generate_readme'):
+                self.generate_readme(current_time)
+            if sharding_enabled():
+                export_node_results([{'name': self.account_name, 'success': success,
+                                      'results': self.server_results,
+                                      'next_run_time': self.next_run_time}], current_time)
+            notifier.publish(Notification(self.account_name, success, self.server_results,
+                                          current_time, self.next_run_time))
+            # 清理资源
+            self.shutdown()
+            self.tracer.summary()
+            notifier.close()
+    
+    # =================================================================
+    #                       11. 状态查询模块
+    # =================================================================
+    
+    def fetch_status(self):
+        """只读查询全部服务器的到期时间（不点击续期），返回状态记录列表
+
+        登录后通过 HTTP 会话并发读取；浏览器登录时把会话交给 HTTP 会话继续并发读取，
+        HTTP 读取不到的服务器再用浏览器页面补读。
+        """
+        self.validate_config()
+        tasks = self.build_tasks(self.get_server_configs())
+        
+        self.http_engine = HTTPRenewEngine(self.account, PanelHTTPSession(pool_size=STATUS_CONCURRENCY))
+        logged_in = with_retries("HTTP 登录", self.http_engine.login,
+                                 should_retry=lambda ok: not ok and self.http_engine.unreachable)
+        if not logged_in:
+            if RENEW_ENGINE == 'http':
+                raise RuntimeError("HTTP 登录失败")
+            self._ensure_browser()
+            self.http_engine.session.load_storage_state(self.context.storage_state())
+        
+        def read_expire_time(task):
+            server_url, _ = task
+            try:
+                return self.http_engine.get_expire_time(server_url, server_id_from_url(server_url))
+            except Exception as e:
+                print(f"⚠️ [HTTP] 读取到期时间失败 ({server_url}): {e}")
+                return None
+        
+        with ThreadPoolExecutor(max_workers=min(STATUS_CONCURRENCY, max(1, len(tasks))),
+                                thread_name_prefix="status-worker") as pool:
+            expire_times = list(pool.map(read_expire_time, tasks))
+        
+        missing = [index for index, expire_time in enumerate(expire_times) if expire_time is None]
+        if missing and RENEW_ENGINE != 'http':
+            print(f"🌐 {len(missing)} 个服务器改用浏览器读取到期时间...")
+            self._ensure_browser()
+            for index in missing:
+                server_url = tasks[index][0]
+                try:
+                    self._navigate(server_url, server_id_from_url(server_url))
+                    expire_times[index] = self.get_server_expire_time()
+                except Exception as e:
+                    print(f"❌ 读取服务器页面失败 ({server_url}): {e}")
+        
+        now = datetime.now(timezone.utc)
+        return [status_record(self.account_name, server_url, server_name, expire_time, now)
+                for (server_url, server_name), expire_time in zip(tasks, expire_times)]
+
+# =====================================================================
+#                          多账号运行器
+# =====================================================================
+
+class SharedBrowser:
+    """多个账号共用的浏览器进程，首次需要浏览器时才启动"""
+    
+    def __init__(self):
+        self.playwright = None
+        self.browser = None
+    
+    def get(self):
+        """返回（必要时启动）共用的浏览器"""
+        if self.browser is None:
+            self.playwright = playwright_api().sync_playwright().start()
+            self.browser = self.playwright.chromium.launch(headless=HEADLESS)
+            print("✅ 共用浏览器已启动")
+        return self.browser
+    
+    def close(self):
+        """关闭共用的浏览器"""
+        if self.playwright is None:
+            return
+        try:
+            self.browser.close()
+            self.playwright.stop()
+            print("✅ 共用浏览器已关闭")
+        except Exception as e:
+            print(f"❌ 关闭共用浏览器时发生错误: {e}")
+
+
+def run_account_batch(accounts, run_started_at=None):
+    """在当前进程中共用一个浏览器依次处理一批账号，每个账号使用独立的浏览器上下文
+
+    run_started_at 为整次运行的开始时间，进程池工作进程据此计算剩余的运行时间预算。
+    """
+    shared_browser = SharedBrowser()
+    reports = []
+    try:
+        for account in accounts:
+            print(f"\n👤 ===== 账号: {account['name']} =====")
+            renewer = GTXGamingRenewer(account, shared_browser=shared_browser)
+            renewer.run_started_at = run_started_at
+            try:
+                success = renewer.execute()
+            except Exception as e:
+                print(f"💥 账号 {account['name']} 运行时发生错误: {e}")
+                success = False
+            finally:
+                renewer.shutdown()
+                renewer.tracer.summary()
+            reports.append({
+                'name': account['name'],
+                'success': success,
+                'results': renewer.server_results,
+                'next_run_time': renewer.next_run_time,
+                'history_run_id': renewer.history_run_id,
+            })
+    finally:
+        shared_browser.close()
+    return reports
+
+
+class MultiAccountRunner:
+    """多账号运行器：账号较少时在单进程内共用一个浏览器，较多时分摊到进程池"""
+    
+    def __init__(self, accounts):
+        self.accounts = accounts
+        self.reports = []
+    
+    def _run_accounts(self):
+        batches = [self.accounts[i:i + ACCOUNTS_PER_PROCESS]
+                   for i in range(0, len(self.accounts), ACCOUNTS_PER_PROCESS)]
+        if len(batches) == 1:
+            return run_account_batch(batches[0])
+        
+        workers = min(ACCOUNT_PROCESSES, len(batches))
+        print(f"⚡ {len(self.accounts)} 个账号分为 {len(batches)} 批，由 {workers} 个进程处理")
+        reports = []
+        run_started_at = process_started_at()
+        from concurrent.futures import ProcessPoolExecutor  # 仅多进程时导入
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for batch_reports in pool.map(run_account_batch, batches, [run_started_at] * len(batches)):
+                reports.extend(batch_reports)
+        return reports
+    
+    def generate_readme(self, timestamp):
+        """生成按账号分节的 README.md"""
+        next_run_time = min((report['next_run_time'] for report in self.reports
+                             if report['next_run_time']), default=None)
+        readme_content = render_readme_header(timestamp, next_run_time)
+        readme_content += f"**运行结果**: <br>\n"
+        history = RunHistoryStore.open()
+        try:
+            for report in self.reports:
+                icon = "✅" if report['success'] else "❌"
+                results = report['results']
+                if history is not None and report['history_run_id']:
+                    results = history.run_results(report['history_run_id'])
+                readme_content += "\n" + render_server_results(
+                    results, title=f"#### 👤账号：{report['name']} {icon}\n\n")
+            if history is not None:
+                readme_content += render_history_trends(history.trends())
+        finally:
+            if history is not None:
+                history.close()
+        write_readme(readme_content)
+    
+    def run(self):
+        """运行全部账号并汇总报告"""
+        current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        
+        try:
+            print(f"🚀 启动 GTX Gaming 多账号续期（共 {len(self.accounts)} 个账号）")
+            print("=" * 50)
+            self.reports = self._run_accounts()
             
-            return success_count > 0
+            success_accounts = sum(1 for report in self.reports if report['success'])
+            print(f"\n=== 多账号处理完成 ===")
+            print(f"账号总计: {len(self.reports)} 个")
+            print(f"成功账号: {success_accounts} 个")
+            return success_accounts > 0
             
         except Exception as e:
             print(f"💥 运行时发生错误: {e}")
             return False
         finally:
-            # 生成报告
             self.generate_readme(current_time)
-            # 清理资源
-            self.close()
+            if sharding_enabled():
+                export_node_results(self.reports, current_time)
+            notifier = Notifier()
+            for report in self.reports:
+                notifier.publish(Notification(report['name'], report['success'], report['results'],
+                                              current_time, report['next_run_time']))
+            notifier.close()
+
+# =====================================================================
+#                          常驻进程模式
+# =====================================================================
+
+def result_to_dict(result):
+    """把结果元组转换为 JSON 友好的字典"""
+    server_id, status, old_expire, new_expire, server_name = result
+    return {'server_id': server_id, 'status': status, 'old_expire': old_expire,
+            'new_expire': new_expire, 'name': server_name}
+
+
+class RenewDaemon:
+    """常驻进程：保持 Playwright 驱动、浏览器与登录会话常热，通过 Unix Socket 接收续期任务
+
+    Playwright 同步 API 只能在创建它的线程中使用，因此 Socket 线程只负责收发，
+    所有任务都放入队列由主线程执行。
+    """
+    
+    def __init__(self, socket_path=DAEMON_SOCKET, account=None):
+        self.socket_path = socket_path
+        self.account = account
+        self.renewer = None
+        self.jobs = queue.Queue()
+        self.running = False
+        self.started_at = time.time()
+        self.processed = 0
+        self.servers_since_recycle = 0
+        self.recycles = 0
+        self._server = None
+        self._last_health_check = time.time()
+        self.notifier = Notifier()
+    
+    # ----------------------------- 生命周期 ----------------------------
+    
+    def _warm_up(self, storage_state=None):
+        """登录并预热浏览器；storage_state 用于回收后直接复用会话"""
+        renewer = GTXGamingRenewer(self.account)
+        renewer.validate_config()
+        if RENEW_ENGINE in ('auto', 'http'):
+            renewer.http_engine = HTTPRenewEngine(renewer.account)
+            if storage_state:
+                renewer.http_engine.session.load_storage_state(storage_state)
+            if not ((storage_state and renewer.http_engine.is_authenticated()) or renewer.http_engine.login()):
+                renewer.http_engine.close()
+                renewer.http_engine = None
+        if RENEW_ENGINE != 'http':
+            renewer.seed_storage_state = storage_state
+            renewer._ensure_browser()
+            # 磁盘缓存或回收前的会话可能已在面板端失效，先校验再接收任务
+            if storage_state and not renewer._validate_cached_session():
+                renewer.seed_storage_state = None
+                if not renewer.login_to_panel():
+                    raise RuntimeError("浏览器登录失败")
+        elif renewer.http_engine is None:
+            raise RuntimeError("HTTP 登录失败")
+        self.renewer = renewer
+        self.servers_since_recycle = 0
+        print("🔥 续期器已预热")
+    
+    def _recycle(self, reason):
+        """回收浏览器并重新预热，尽量复用现有会话避免重新登录"""
+        print(f"♻️ 回收浏览器: {reason}")
+        storage_state = None
+        try:
+            if self.renewer.context is not None:
+                storage_state = self.renewer.context.storage_state()
+            elif self.renewer.http_engine is not None:
+                storage_state = self.renewer.http_engine.session.storage_state()
+        except Exception as e:
+            print(f"⚠️ 读取会话状态失败，将重新登录: {e}")
+        self.renewer.shutdown()
+        self.recycles += 1
+        self._warm_up(storage_state)
+    
+    def _is_healthy(self):
+        """检查浏览器与 HTTP 会话是否可用"""
+        try:
+            if self.renewer.page is not None:
+                if not self.renewer.browser.is_connected():
+                    return False
+                self.renewer.page.evaluate("1")
+            if self.renewer.http_engine is not None and not self.renewer.http_engine.is_authenticated():
+                return False
+            return True
+        except Exception:
+            return False
+    
+    # ----------------------------- 任务处理 ----------------------------
+    
+    def _handle(self, request):
+        command = request.get('cmd')
+        if command == 'health':
+            healthy = self._is_healthy()
+            return {'ok': healthy, 'uptime_s': round(time.time() - self.started_at, 1),
+                    'processed': self.processed, 'recycles': self.recycles,
+                    'browser': self.renewer.page is not None,
+                    'http': self.renewer.http_engine is not None}
+        if command == 'recycle':
+            self._recycle("手动请求")
+            return {'ok': True}
+        if command == 'shutdown':
+            self.running = False
+            return {'ok': True}
+        
+        if command == 'renew':
+            tasks = self.renewer.build_tasks(iter_servers(request.get('servers', [])))
+        elif command == 'renew_due':
+            tasks = self.renewer.build_tasks(self.renewer.get_server_configs())
+            due, _ = self.renewer.plan_tasks(tasks)
+            tasks = [task for _, task in due]
+        else:
+            return {'ok': False, 'error': f"未知命令: {command}"}
+        
+        if not self._is_healthy():
+            self._recycle("健康检查失败")
+        # 每个任务使用独立的 Tracer 与延后列表，不会随常驻时间增长
+        self.renewer.tracer = Tracer(account=self.renewer.account_name)
+        self.renewer.deferred = []
+        started_at = datetime.now(timezone.utc)
+        try:
+            results = self.renewer.process_servers(tasks) if tasks else []
+        finally:
+            self.renewer.screenshots.reset()
+        self.renewer.record_results(results)
+        if results:
+            self.renewer.record_history(results, started_at)
+            self.notifier.publish(Notification(
+                self.renewer.account_name, any(result[1] != "failed" for result in results), results,
+                datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+        self.processed += len(results)
+        self.servers_since_recycle += len(results)
+        if self.servers_since_recycle >= DAEMON_RECYCLE_SERVERS:
+            self._recycle(f"已处理 {self.servers_since_recycle} 个服务器")
+        return {'ok': True, 'results': [result_to_dict(result) for result in results]}
+    
+    def _start_socket_server(self):
+        daemon = self
+        
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                line = self.rfile.readline()
+                try:
+                    request = json.loads(line or b'{}')
+                except ValueError:
+                    response = {'ok': False, 'error': "请求不是合法的 JSON"}
+                else:
+                    reply = queue.Queue(maxsize=1)
+                    daemon.jobs.put((request, reply))
+                    try:
+                        response = reply.get(timeout=DAEMON_JOB_TIMEOUT)
+                    except queue.Empty:
+                        response = {'ok': False, 'error': "任务超时"}
+                self.wfile.write(json.dumps(response, ensure_ascii=False).encode('utf-8') + b'\n')
+        
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+        self._server = socketserver.ThreadingUnixStreamServer(self.socket_path, Handler)
+        self._server.daemon_threads = True
+        os.chmod(self.socket_path, 0o600)
+        threading.Thread(target=self._server.serve_forever, name="daemon-socket", daemon=True).start()
+    
+    def serve(self):
+        """运行常驻进程主循环"""
+        self._warm_up(load_session_cache(session_cache_path(self.account['name'] if self.account else "")))
+        self._start_socket_server()
+        self.running = True
+        signal.signal(signal.SIGTERM, lambda *_: setattr(self, 'running', False))
+        print(f"🛰️ 常驻进程已启动，监听 {self.socket_path}")
+        
+        try:
+            while self.running:
+                try:
+                    request, reply = self.jobs.get(timeout=1)
+                except queue.Empty:
+                    if time.time() - self._last_health_check > DAEMON_HEALTH_INTERVAL:
+                        self._periodic_health_check()
+                    continue
+                try:
+                    response = self._handle(request)
+                except Exception as e:
+                    print(f"❌ 任务执行失败: {e}")
+                    response = {'ok': False, 'error': str(e)}
+                reply.put(response)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            print("🛑 常驻进程退出")
+            self._server.shutdown()
+            self._server.server_close()
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+            self.renewer.shutdown()
+            self.notifier.close()
+    
+    def _periodic_health_check(self):
+        """空闲时定期检查，不健康则回收重建"""
+        self._last_health_check = time.time()
+        if not self._is_healthy():
+            try:
+                self._recycle("定期健康检查失败")
+            except Exception as e:
+                print(f"❌ 重新预热失败: {e}")
+
+
+def submit_daemon_job(request, socket_path=DAEMON_SOCKET):
+    """向常驻进程提交任务并返回响应"""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.settimeout(DAEMON_JOB_TIMEOUT + 5)
+        client.connect(socket_path)
+        client.sendall(json.dumps(request).encode('utf-8') + b'\n')
+        data = b''
+        while not data.endswith(b'\n'):
+            chunk = client.recv(65536)
+            if not chunk:
+                break
+            data += chunk
+    return json.loads(data or b'{}')
 
 # =====================================================================
 #                          程序启动点
 # =====================================================================
 
-if __name__ == "__main__":
+def report_cold_start(tracer):
+    """记录进程冷启动耗时（解释器启动、模块导入与配置读取），每个进程只在开始处理前调用一次"""
+    uptime = process_uptime()
+    if uptime is None:
+        return
+    print(f"⏱️ 冷启动耗时: {uptime * 1000:.0f}ms（Playwright 已导入: {'是' if 'playwright' in sys.modules else '否'}）")
+    tracer.record('cold_start', uptime * 1000, playwright_loaded='playwright' in sys.modules)
+
+
+def run_renewal():
+    """执行一次续期任务（单账号或多账号）"""
     print("开始执行 GTX Gaming 服务器续期任务...")
+    accounts = load_accounts()
+    if accounts:
+        report_cold_start(Tracer())
+        return MultiAccountRunner(accounts).run()
     renewer = GTXGamingRenewer()
-    success = renewer.run()
+    report_cold_start(renewer.tracer)
+    return renewer.run()
+
+
+def run_status(output_format='json', output=None):
+    """只读查询全部账号下服务器的到期时间并输出，全部读取成功时返回 True
+
+    进度信息输出到 stderr，stdout 只保留 JSON/CSV 数据，方便管道与定时任务使用。
+    """
+    records = []
+    with redirect_stdout(sys.stderr):
+        for account in load_accounts() or [None]:
+            renewer = GTXGamingRenewer(account)
+            try:
+                records.extend(renewer.fetch_status())
+            except Exception as e:
+                print(f"❌ 查询账号 {renewer.account_name or '默认账号'} 的服务器状态失败: {e}")
+                return False
+            finally:
+                renewer.shutdown()
+    
+    if output:
+        with open(output, 'w', encoding='utf-8', newline='') as f:
+            write_status(records, output_format, f)
+    else:
+        write_status(records, output_format)
+    return all(record['state'] != "unknown" for record in records)
+
+
+def parse_args(argv=None):
+    """解析命令行参数，未指定子命令时执行一次续期"""
+    parser = argparse.ArgumentParser(description="GTX Gaming 自动续期脚本")
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.add_parser('run', help="执行一次续期（默认）")
+    subparsers.add_parser('daemon', help="以常驻进程运行，通过 Unix Socket 接收任务")
+    merge = subparsers.add_parser('merge', help="合并各分片节点的结果并生成 README.md")
+    merge.add_argument('files', nargs='*', help=f"节点结果文件，默认 {SHARD_RESULTS_DIR}/*.json")
+    status = subparsers.add_parser('status', help="只读查询全部服务器的到期时间")
+    status.add_argument('--format', choices=['json', 'csv'], default='json', help="输出格式")
+    status.add_argument('--output', help="写入文件，默认输出到标准输出")
+    submit = subparsers.add_parser('submit', help="向常驻进程提交任务")
+    submit.add_argument('cmd', choices=['renew', 'renew_due', 'health', 'recycle', 'shutdown'])
+    submit.add_argument('servers', nargs='*', help="renew 命令的服务器地址")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    
+    if args.command == 'daemon':
+        RenewDaemon().serve()
+        exit(0)
+    
+    if args.command == 'merge':
+        exit(0 if run_merge(args.files) else 1)
+    
+    if args.command == 'status':
+        exit(0 if run_status(args.format, args.output) else 1)
+    
+    if args.command == 'submit':
+        try:
+            response = submit_daemon_job({'cmd': args.cmd, 'servers': args.servers})
+        except OSError as e:
+            print(f"❌ 无法连接常驻进程 {DAEMON_SOCKET}: {e}")
+            exit(1)
+        print(json.dumps(response, ensure_ascii=False, indent=2))
+        exit(0 if response.get('ok') else 1)
+    
+    success = run_renewal()
     
     if success:
         print("任务执行成功。")
@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+GTX Gaming 模拟面板
+
+在本地复现 main.py 访问的页面与接口，用于回归测试与性能基准测试：
+  /auth/login                              登录页（表单登录与 JSON 登录）
+  /home                                    首页（需要登录）
+  /server/<id>                             服务器页面，含 "Expiry Date" 与 "EXTEND 72 HOUR(S)" 按钮
+  /api/client                              会话校验接口
+  /api/client/freeservers/<id>             免费服务器信息（到期时间）
+  /api/client/freeservers/<id>/renew       续期接口，返回 200（成功）或 400（今日已续期）
+
+用法:
+  python mock_panel.py --port 8080 --servers 100 --latency-ms 50 --error-rate 0.05
+  GTX_BASE_URL=http://127.0.0.1:8080 REMEMBER_WEB_COOKIE=mock-remember-token python main.py
+"""
+
+# =====================================================================
+#                           导入依赖
+# =====================================================================
+
+import argparse
+import html
+import json
+import random
+import re
+import secrets
+import threading
+import time
+import urllib.parse
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# =====================================================================
+#                           配置区域
+# =====================================================================
+
+REMEMBER_COOKIE_NAME = 'remember_web_59ba36addc2b2f9401580f014c7f58ea4e30989d'
+MOCK_REMEMBER_TOKEN = 'mock-remember-token'
+MOCK_EMAIL = 'mock@example.com'
+MOCK_PASSWORD = 'mock-password'
+EXTEND_HOURS = 72
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+LOGIN_PAGE = """<!DOCTYPE html>
+<html><head><meta name="csrf-token" content="{csrf}"><title>Login</title></head>
+<body>
+<form method="post" action="/auth/login">
+  <input name="email" type="email">
+  <input name="password" type="password">
+  <button type="submit">Login</button>
+</form>
+</body></html>"""
+
+HOME_PAGE = """<!DOCTYPE html>
+<html><head><meta name="csrf-token" content="{csrf}"><title>Home</title></head>
+<body><main><h1>Your Servers</h1><ul>{servers}</ul></main></body></html>"""
+
+SERVER_PAGE = """<!DOCTYPE html>
+<html><head><meta name="csrf-token" content="{csrf}"><title>{server_id}</title></head>
+<body>
+<main>
+  <h1>Server {server_id}</h1>
+  <p id="expiry">Expiry Date: {expiry}</p>
+  <button id="extend">EXTEND 72 HOUR(S)</button>
+  <div id="messages"></div>
+</main>
+<script>
+  const xsrf = decodeURIComponent((document.cookie.match(/XSRF-TOKEN=([^;]+)/) || [])[1] || '');
+  document.getElementById('extend').addEventListener('click', async () => {{
+    const response = await fetch('/api/client/freeservers/{server_id}/renew', {{
+      method: 'POST',
+      headers: {{'Accept': 'application/json', 'X-XSRF-TOKEN': xsrf, 'X-Requested-With': 'XMLHttpRequest'}},
+    }});
+    const data = await response.json().catch(() => ({{}}));
+    if (response.status === 200) {{
+      document.getElementById('expiry').textContent = 'Expiry Date: ' + data.attributes.expiry;
+    }} else {{
+      const alert = document.createElement('div');
+      alert.className = 'alert alert-danger';
+      alert.textContent = data.error || ('Request failed with status ' + response.status);
+      document.getElementById('messages').appendChild(alert);
+    }}
+  }});
+</script>
+</body></html>"""
+
+# =====================================================================
+#                           模拟面板状态
+# =====================================================================
+
+class MockPanelState:
+    """模拟面板的服务器与会话状态（线程安全）"""
+
+    def __init__(self, server_count=10, latency_ms=0, jitter_ms=0, error_rate=0.0,
+                 already_extended_rate=0.0, seed=None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.already_extended_rate = already_extended_rate
+        self.random = random.Random(seed)
+        self.sessions = {}
+        self.servers = {}
+        self.requests = 0
+        self.renewals = 0
+        self._lock = threading.Lock()
+        for index in range(server_count):
+            self.get_server(server_id_for(index))
+
+    def get_server(self, server_id):
+        """获取服务器状态，不存在时按配置的比例随机生成"""
+        with self._lock:
+            if server_id not in self.servers:
+                now = datetime.now(timezone.utc).replace(microsecond=0, tzinfo=None)
+                self.servers[server_id] = {
+                    'expiry': now + timedelta(hours=self.random.randint(1, 96)),
+                    'extended_today': self.random.random() < self.already_extended_rate,
+                }
+            return self.servers[server_id]
+
+    def renew(self, server_id):
+        """续期服务器，返回 (HTTP 状态码, 响应体)"""
+        server = self.get_server(server_id)
+        with self._lock:
+            if self.random.random() < self.error_rate:
+                return 500, {'error': 'Internal Server Error'}
+            if server['extended_today']:
+                return 400, {'error': 'You have already extended this server once per day.'}
+            server['expiry'] += timedelta(hours=EXTEND_HOURS)
+            server['extended_today'] = True
+            self.renewals += 1
+            return 200, {'attributes': {'identifier': server_id,
+                                        'expiry': server['expiry'].strftime(TIME_FORMAT)}}
+
+    def new_session(self):
+        """创建登录会话，返回 (session, xsrf)"""
+        session, xsrf = secrets.token_hex(16), secrets.token_urlsafe(24)
+        with self._lock:
+            self.sessions[session] = xsrf
+        return session, xsrf
+
+    def delay(self):
+        """模拟网络与服务端延迟"""
+        with self._lock:
+            self.requests += 1
+            jitter = self.random.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0
+        latency = max(0.0, self.latency_ms + jitter) / 1000
+        if latency:
+            time.sleep(latency)
+
+
+def server_id_for(index):
+    """生成模拟服务器 ID"""
+    return f"{index:08x}"
+
+# =====================================================================
+#                           请求处理
+# =====================================================================
+
+class MockPanelHandler(BaseHTTPRequestHandler):
+    """模拟面板请求处理器"""
+
+    protocol_version = 'HTTP/1.1'
+    server_version = 'MockGTXPanel/1.0'
+
+    @property
+    def state(self):
+        return self.server.state
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    # ----------------------------- 工具方法 ----------------------------
+
+    def _cookies(self):
+        cookies = {}
+        for part in (self.headers.get('Cookie') or '').split(';'):
+            name, _, value = part.strip().partition('=')
+            if name:
+                cookies[name] = value
+        return cookies
+
+    def _session(self):
+        """返回当前请求对应的会话 ID，remember Cookie 有效时自动创建会话"""
+        cookies = self._cookies()
+        session = cookies.get('mock_session')
+        if session and session in self.state.sessions:
+            return session, []
+        if cookies.get(REMEMBER_COOKIE_NAME) == MOCK_REMEMBER_TOKEN:
+            session, xsrf = self.state.new_session()
+            return session, self._session_cookies(session, xsrf)
+        return None, []
+
+    def _session_cookies(self, session, xsrf):
+        return [
+            f"mock_session={session}; Path=/; HttpOnly; SameSite=Lax",
+            f"XSRF-TOKEN={urllib.parse.quote(xsrf)}; Path=/; SameSite=Lax",
+        ]
+
+    def _wants_json(self):
+        return 'application/json' in (self.headers.get('Accept') or '') and \
+            'text/html' not in (self.headers.get('Accept') or '').split(',')[0]
+
+    def _send(self, status, body, content_type='text/html; charset=utf-8', headers=()):
+        data = body.encode('utf-8') if isinstance(body, str) else body
+        lines = [f"HTTP/1.1 {status} {self.responses.get(status, ('',))[0]}",
+                 f"Server: {self.server_version}",
+                 f"Content-Type: {content_type}",
+                 f"Content-Length: {len(data)}"]
+        lines += [f"{name}: {value}" for name, value in headers]
+        # 头部与正文一次写出，避免 Nagle 与延迟确认带来的额外延迟
+        self.wfile.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + data)
+        self.wfile.flush()
+
+    def _send_json(self, status, payload, headers=()):
+        self._send(status, json.dumps(payload), 'application/json', headers)
+
+    def _redirect(self, location, headers=()):
+        self._send(302, '', headers=[('Location', location)] + list(headers))
+
+    def _read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length).decode('utf-8') if length else ''
+
+    # ----------------------------- 路由 --------------------------------
+
+    def do_GET(self):
+        self.state.delay()
+        path = urllib.parse.urlsplit(self.path).path.rstrip('/') or '/'
+        session, set_cookies = self._session()
+        cookie_headers = [('Set-Cookie', cookie) for cookie in set_cookies]
+
+        if path == '/auth/login':
+            if session:
+                return self._redirect('/home', cookie_headers)
+            return self._send(200, LOGIN_PAGE.format(csrf=secrets.token_hex(8)))
+
+        if session is None:
+            if path.startswith('/api/'):
+                return self._send_json(401, {'errors': [{'code': 'AuthenticationException'}]})
+            return self._redirect('/auth/login')
+
+        csrf = secrets.token_hex(8)
+        if path in ('/', '/home'):
+            items = ''.join(f'<li><a href="/server/{sid}">{sid}</a></li>' for sid in list(self.state.servers)[:50])
+            return self._send(200, HOME_PAGE.format(csrf=csrf, servers=items), headers=cookie_headers)
+
+        if path == '/api/client':
+            data = [{'object': 'server', 'attributes': {'identifier': sid}} for sid in list(self.state.servers)[:50]]
+            return self._send_json(200, {'object': 'list', 'data': data}, cookie_headers)
+
+        match = re.fullmatch(r'/api/client/freeservers/([\w-]+)', path)
+        if match:
+            server = self.state.get_server(match.group(1))
+            return self._send_json(200, {'attributes': {'identifier': match.group(1),
+                                                        'expiry': server['expiry'].strftime(TIME_FORMAT)}},
+                                   cookie_headers)
+
+        match = re.fullmatch(r'/server/([\w-]+)', path)
+        if match:
+            server = self.state.get_server(match.group(1))
+            page = SERVER_PAGE.format(csrf=csrf, server_id=html.escape(match.group(1)),
+                                      expiry=server['expiry'].strftime(TIME_FORMAT))
+            return self._send(200, page, headers=cookie_headers)
+
+        self._send(404, 'Not Found')
+
+    def do_POST(self):
+        self.state.delay()
+        path = urllib.parse.urlsplit(self.path).path.rstrip('/')
+        body = self._read_body()
+
+        if path == '/auth/login':
+            if 'json' in (self.headers.get('Content-Type') or ''):
+                payload = json.loads(body or '{}')
+                email, password = payload.get('user'), payload.get('password')
+            else:
+                form = urllib.parse.parse_qs(body)
+                email, password = form.get('email', [''])[0], form.get('password', [''])[0]
+
+            if email != MOCK_EMAIL or password != MOCK_PASSWORD:
+                if self._wants_json():
+                    return self._send_json(422, {'errors': [{'detail': 'These credentials do not match our records.'}]})
+                return self._redirect('/auth/login')
+
+            session, xsrf = self.state.new_session()
+            cookie_headers = [('Set-Cookie', cookie) for cookie in self._session_cookies(session, xsrf)]
+            if self._wants_json():
+                return self._send_json(200, {'data': {'complete': True, 'intended': '/home'}}, cookie_headers)
+            return self._redirect('/home', cookie_headers)
+
+        session, set_cookies = self._session()
+        if session is None:
+            return self._send_json(401, {'errors': [{'code': 'AuthenticationException'}]})
+
+        match = re.fullmatch(r'/api/client/freeservers/([\w-]+)/renew', path)
+        if match:
+            xsrf = urllib.parse.unquote(self.headers.get('X-XSRF-TOKEN') or '')
+            if not set_cookies and xsrf != self.state.sessions.get(session):
+                return self._send_json(419, {'errors': [{'detail': 'CSRF token mismatch.'}]})
+            status, payload = self.state.renew(match.group(1))
+            return self._send_json(status, payload, [('Set-Cookie', cookie) for cookie in set_cookies])
+
+        self._send_json(404, {'error': 'Not Found'})
+
+# =====================================================================
+#                           服务启动
+# =====================================================================
+
+def start_mock_panel(host='127.0.0.1', port=0, verbose=False, **state_options):
+    """在后台线程启动模拟面板，返回 (server, base_url)"""
+    server = ThreadingHTTPServer((host, port), MockPanelHandler)
+    server.daemon_threads = True
+    server.state = MockPanelState(**state_options)
+    server.verbose = verbose
+    threading.Thread(target=server.serve_forever, name="mock-panel", daemon=True).start()
+    return server, f"http://{host}:{server.server_port}"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="GTX Gaming 模拟面板")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--servers', type=int, default=10, help="预先生成的服务器数量")
+    parser.add_argument('--latency-ms', type=float, default=0, help="每个请求的附加延迟")
+    parser.add_argument('--jitter-ms', type=float, default=0, help="延迟抖动范围")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="续期接口返回 500 的概率")
+    parser.add_argument('--already-extended-rate', type=float, default=0.0, help="服务器今日已续期的比例")
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--verbose', action='store_true')
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    server, base_url = start_mock_panel(
+        args.host, args.port, verbose=args.verbose, server_count=args.servers,
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+        already_extended_rate=args.already_extended_rate, seed=args.seed)
+    print(f"🧪 模拟面板已启动: {base_url}")
+    print(f"🍪 REMEMBER_WEB_COOKIE={MOCK_REMEMBER_TOKEN}  📧 {MOCK_EMAIL} / {MOCK_PASSWORD}")
+    print(f"🖥️ 示例服务器: {base_url}/server/{server_id_for(0)}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+"""测试公共夹具：在导入 main 之前关闭会写入工作目录的运行时文件，并提供模拟面板"""
+
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+for name in ('SESSION_CACHE_FILE', 'SERVER_STATE_FILE', 'RUN_HISTORY_DB', 'SELECTOR_CACHE_FILE',
+             'TRACE_FILE', 'LEASE_DB', 'SERVER_LIST', 'SERVER_LIST_FILE'):
+    os.environ[name] = ''
+for name in ('FORCE_RENEW', 'SERVER_TAGS', 'SERVER_EXCLUDE_TAGS', 'SERVER_MATCH', 'ACCOUNTS', 'ACCOUNTS_FILE'):
+    os.environ.pop(name, None)
+
+from mock_panel import start_mock_panel  # noqa: E402
+
+
+@pytest.fixture
+def mock_panel():
+    """启动一个全新的模拟面板，返回 (server, base_url)"""
+    server, base_url = start_mock_panel(server_count=5, seed=7)
+    yield server, base_url
+    server.shutdown()
@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+import json
+
+import pytest
+
+import main
+
+
+def test_load_accounts_normalises_entries(monkeypatch):
+    monkeypatch.setattr(main, 'ACCOUNTS', json.dumps({'accounts': [
+        {'name': "a", 'cookie': "token", 'servers': '["aaaa1111"]'},
+        {'email': "b@example.com", 'password': "secret", 'servers_file': "b.jsonl"},
+    ]}))
+    first, second = main.load_accounts()
+    assert (first['name'], first['remember_web_cookie'], first['servers']) == ("a", "token", ["aaaa1111"])
+    assert (second['name'], second['servers'], second['servers_file']) == ("account2", None, "b.jsonl")
+
+
+@pytest.mark.parametrize('value', [
+    '{"name": "a"}',
+    '["a"]',
+    '[{"name": "a", "servers": "not json"}]',
+    '[{"name": "a", "servers": "{\\"a\\": 1}"}]',
+])
+def test_invalid_accounts_are_reported_not_raised(monkeypatch, capsys, value):
+    monkeypatch.setattr(main, 'ACCOUNTS', value)
+    assert main.load_accounts() == []
+    assert "解析多账号配置失败" in capsys.readouterr().out
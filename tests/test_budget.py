@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+import time
+
+import main
+
+
+def test_budget_counts_from_the_given_run_start():
+    budget = main.RunBudget(budget_seconds=100, reserve_seconds=10, started_at=time.time() - 95)
+    assert budget.remaining() < 0
+    assert not budget.admit()
+
+    budget = main.RunBudget(budget_seconds=100, reserve_seconds=10, started_at=time.time() - 30)
+    assert 59 < budget.remaining() <= 60
+
+
+def test_admit_does_not_serialize_servers_in_flight():
+    # 并发工作者同时处理：只要剩余时间够处理一个服务器就放行
+    budget = main.RunBudget(budget_seconds=100, reserve_seconds=0, prior_seconds=30, started_at=time.time())
+    assert all(budget.admit() for _ in range(8))
+    assert budget.in_flight == 8
+
+    budget.observe(30)
+    budget.release()
+    assert budget.in_flight == 6
+
+
+def test_admit_denies_when_one_server_no_longer_fits():
+    budget = main.RunBudget(budget_seconds=100, reserve_seconds=0, prior_seconds=30, started_at=time.time() - 75)
+    assert not budget.admit()
+    assert budget.in_flight == 0
+    assert "处理中 0 个" in budget.shortfall()
+
+
+def test_budget_without_estimate_admits_while_time_remains():
+    budget = main.RunBudget(budget_seconds=100, reserve_seconds=0, started_at=time.time())
+    assert all(budget.admit() for _ in range(50))
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import main
+from mock_panel import MOCK_REMEMBER_TOKEN, server_id_for
+
+
+@pytest.fixture
+def engine(mock_panel):
+    _, base_url = mock_panel
+    account = dict(main.default_account(), remember_web_cookie=MOCK_REMEMBER_TOKEN, email="", password="")
+    engine = main.HTTPRenewEngine(account, session=main.PanelHTTPSession(base_url))
+    yield engine
+    engine.close()
+
+
+def set_server(server, index, hours, extended_today):
+    now = datetime.now(timezone.utc).replace(microsecond=0, tzinfo=None)
+    server.state.servers[server_id_for(index)] = {'expiry': now + timedelta(hours=hours),
+                                                  'extended_today': extended_today}
+
+
+def test_cookie_login(engine):
+    assert engine.login()
+    assert not (engine.unreachable or engine.rejected)
+
+
+def test_extend_server_results_are_verified(mock_panel, engine):
+    server, base_url = mock_panel
+    set_server(server, 0, 10, False)
+    set_server(server, 1, 80, True)
+    set_server(server, 2, 10, True)
+    assert engine.login()
+
+    result = engine.extend_server(f"{base_url}/server/{server_id_for(0)}", "fresh")
+    assert result[1] == "success"
+    assert main.parse_panel_time(result[3]) > main.parse_panel_time(result[2])
+
+    assert engine.extend_server(f"{base_url}/server/{server_id_for(1)}", "done")[1] == "already_extended"
+    # 400 但到期时间仍在续期窗口内：交给浏览器确认
+    assert engine.extend_server(f"{base_url}/server/{server_id_for(2)}", "stuck") is None
+
+
+def test_invalid_cookie_is_a_definite_rejection(mock_panel):
+    _, base_url = mock_panel
+    account = dict(main.default_account(), remember_web_cookie="expired-token", email="", password="")
+    engine = main.HTTPRenewEngine(account, session=main.PanelHTTPSession(base_url))
+    try:
+        assert not engine.login()
+        assert engine.rejected and not engine.unreachable
+    finally:
+        engine.close()
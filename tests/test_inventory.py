@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+import json
+
+import main
+from mock_panel import server_id_for
+
+
+def test_normalize_accepts_urls_paths_and_ids(mock_panel):
+    _, base_url = mock_panel
+    server_id = server_id_for(0)
+    expected = f"{base_url}/server/{server_id}"
+    for entry in (expected + "/", f"/server/{server_id}", server_id, {'id': server_id, 'name': " alpha "}):
+        server = main.normalize_server_entry(entry, base_url=base_url)
+        assert server['url'] == expected
+        assert server['server_id'] == server_id
+    assert main.normalize_server_entry({'id': server_id, 'name': " alpha "}, base_url=base_url)['name'] == "alpha"
+
+
+def test_iter_servers_deduplicates_skips_invalid_and_filters():
+    entries = ["aaaa1111", {'url': "aaaa1111"}, {'name': "no url"}, 42,
+               {'id': "bbbb2222", 'name': "prod-1", 'tags': "eu, prod"},
+               {'id': "cccc3333", 'name': "dev-1", 'tags': ["eu", "dev"]}]
+    servers = list(main.iter_servers(entries))
+    assert [server['server_id'] for server in servers] == ["aaaa1111", "bbbb2222", "cccc3333"]
+
+    server_filter = main.ServerFilter(tags="eu", exclude_tags="dev", match="prod-*")
+    assert [server['name'] for server in main.iter_servers(entries, server_filter)] == ["prod-1"]
+
+
+def test_inventory_reads_jsonl_csv_and_json(tmp_path):
+    jsonl = tmp_path / "servers.jsonl"
+    jsonl.write_text('# 注释\n{"id": "aaaa1111", "name": "a"}\nnot json\n\n{"id": "bbbb2222"}\n', encoding='utf-8')
+    csv_file = tmp_path / "servers.csv"
+    csv_file.write_text("ID,Name,Tags\naaaa1111,a,eu\nbbbb2222,b,us\n", encoding='utf-8')
+    json_file = tmp_path / "servers.json"
+    json_file.write_text(json.dumps({'servers': ["aaaa1111", "bbbb2222"]}), encoding='utf-8')
+
+    for path in (jsonl, csv_file, json_file):
+        servers = main.ServerInventory(path=str(path)).load()
+        assert [server['server_id'] for server in servers] == ["aaaa1111", "bbbb2222"]
+
+
+def test_inventory_reloads_when_file_changes(tmp_path):
+    path = tmp_path / "servers.json"
+    path.write_text(json.dumps(["aaaa1111"]), encoding='utf-8')
+    inventory = main.ServerInventory(path=str(path))
+    assert len(inventory.load()) == 1
+    path.write_text(json.dumps(["aaaa1111", "bbbb2222"]), encoding='utf-8')
+    assert len(inventory.load()) == 2
+
+
+
+def test_server_list_env_accepts_object_with_servers(monkeypatch):
+    monkeypatch.setattr(main, 'SERVER_LIST', json.dumps({'servers': ["aaaa1111", "bbbb2222"]}))
+    assert [server['server_id'] for server in main.ServerInventory().load()] == ["aaaa1111", "bbbb2222"]
+
+
+def test_invalid_inventories_load_as_empty(tmp_path, monkeypatch):
+    # 不含 servers 的 JSON 对象不能被当作 server_id 列表逐键读取
+    monkeypatch.setattr(main, 'SERVER_LIST', json.dumps({'aaaa1111': {}}))
+    assert main.ServerInventory().load() == []
+
+    # 超过 csv.field_size_limit 的字段会抛出 csv.Error
+    csv_file = tmp_path / "servers.csv"
+    csv_file.write_text("id,name\naaaa1111," + "x" * (main.csv.field_size_limit() + 1) + "\n", encoding='utf-8')
+    assert main.ServerInventory(path=str(csv_file)).load() == []
+
+
+def test_build_tasks_projects_normalised_servers():
+    servers = list(main.iter_servers([{'id': "aaaa1111", 'name': "a"}, "bbbb2222"]))
+    tasks = main.GTXGamingRenewer().build_tasks(servers)
+    assert tasks == [(servers[0]['url'], "a"), (servers[1]['url'], "")]
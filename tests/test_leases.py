@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+import main
+
+
+def open_pair(tmp_path, ttl=600):
+    path = str(tmp_path / "leases.db")
+    return main.LeaseStore(path, node_id="node-a", ttl=ttl), main.LeaseStore(path, node_id="node-b", ttl=ttl)
+
+
+def test_claim_is_exclusive_and_result_is_shared(tmp_path):
+    node_a, node_b = open_pair(tmp_path)
+    assert node_a.claim("abc123")
+    assert not node_b.claim("abc123")
+    assert node_b.result_for("abc123") is None
+
+    result = ("abc123", "success", "2026-10-01 00:00:00", "2026-10-04 00:00:00", "alpha")
+    node_a.complete(result)
+    assert node_b.result_for("abc123") == result
+    assert not node_b.claim("abc123")
+    assert (node_a.claimed, node_b.taken_by_others) == (1, 2)
+
+
+def test_failed_result_releases_lease(tmp_path):
+    node_a, node_b = open_pair(tmp_path)
+    assert node_a.claim("abc123")
+    node_a.complete(("abc123", "failed", None, None, "alpha"))
+    assert node_b.result_for("abc123") is None
+    assert node_b.claim("abc123")
+
+
+def test_expired_lease_can_be_taken_over(tmp_path):
+    path = str(tmp_path / "leases.db")
+    node_a = main.LeaseStore(path, node_id="node-a", ttl=-1)  # 认领后立即过期，模拟节点中途退出
+    node_b = main.LeaseStore(path, node_id="node-b", ttl=600)
+    assert node_a.claim("abc123")
+    assert node_b.claim("abc123")
+    assert not node_a.claim("abc123")
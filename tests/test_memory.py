@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+import main
+
+MB = 1024 * 1024
+
+
+def governor(monkeypatch, rss_mb):
+    """子进程 RSS 读数由 rss_mb[0] 决定的内存治理器"""
+    monkeypatch.setattr(main, 'descendant_pids', lambda pid: [1])
+    monkeypatch.setattr(main, 'read_rss', lambda pid: rss_mb[0] * MB)
+    return main.MemoryGovernor(recycle_servers=0, rss_limit_mb=1024, sample_interval=0)
+
+
+def test_limit_scales_with_live_browsers(monkeypatch):
+    rss_mb = [1500]
+    memory = governor(monkeypatch, rss_mb)
+    memory.browser_opened()
+    assert memory.decide(1) == 'context'
+
+    memory.browser_opened()
+    assert memory.decide(1) is None
+
+    memory.browser_closed()
+    assert memory.decide(1) == 'context'
+
+
+def test_context_recycle_that_freed_nothing_is_not_repeated(monkeypatch):
+    rss_mb = [1500]
+    memory = governor(monkeypatch, rss_mb)
+    assert memory.decide(1) == 'context'
+    memory.recycled('context', rss_before=memory.browser_rss)
+    assert memory.decide(1) is None
+
+    # RSS 回落到上限以下后恢复正常判断
+    rss_mb[0] = 500
+    assert memory.decide(1) is None
+    rss_mb[0] = 1500
+    assert memory.decide(1) == 'context'
+
+
+def test_context_recycle_that_freed_memory_may_repeat(monkeypatch):
+    rss_mb = [1500]
+    memory = governor(monkeypatch, rss_mb)
+    memory.decide(1)
+    rss_mb[0] = 1200
+    memory.recycled('context', rss_before=1500 * MB)
+    assert memory.decide(1) == 'context'
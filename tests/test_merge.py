@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+import json
+
+import main
+
+
+def write_node(directory, name, timestamp, results, run_id="run-2", success=True, next_run_time=None,
+               shard_index=0, shard_count=1):
+    path = directory / f"{name}.json"
+    path.write_text(json.dumps({
+        'run_id': run_id,
+        'node': name,
+        'shard_index': shard_index,
+        'shard_count': shard_count,
+        'timestamp': timestamp,
+        'accounts': [{
+            'name': "",
+            'success': success,
+            'next_run_time': next_run_time,
+            'results': [main.result_to_dict(result) for result in results],
+        }],
+    }), encoding='utf-8')
+    return str(path)
+
+
+def test_merge_combines_nodes_of_the_latest_run(tmp_path):
+    paths = [
+        # 上一次运行的文件：s9 已从清单移除，不应出现在合并结果中
+        write_node(tmp_path, "old", "2026-09-30 00:00:00", [
+            ("s9", "success", None, "2026-10-03 00:00:00", "nine"),
+        ], run_id="run-1"),
+        write_node(tmp_path, "node-a", "2026-10-01 00:00:00", [
+            ("s1", "success", "2026-10-01 10:00:00", "2026-10-04 10:00:00", "one"),
+            ("s2", "failed", None, None, "two"),
+        ], next_run_time="2026-10-03T10:00:00+00:00"),
+        write_node(tmp_path, "node-b", "2026-10-01 00:00:05", [
+            ("s2", "success", None, "2026-10-04 11:00:00", "two"),
+            ("s3", "deferred", None, None, "three"),
+        ], success=False, next_run_time="2026-10-02T10:00:00+00:00"),
+    ]
+
+    timestamp, reports = main.merge_node_results(paths)
+
+    assert timestamp == "2026-10-01 00:00:05"
+    [report] = reports
+    assert report['success'] is True
+    assert report['next_run_time'].isoformat() == "2026-10-02T10:00:00+00:00"
+    statuses = {result[0]: result[1] for result in report['results']}
+    assert statuses == {"s1": "success", "s2": "success", "s3": "deferred"}
+
+
+def test_merge_prefers_newer_nodes_then_processed_results(tmp_path):
+    paths = [
+        write_node(tmp_path, "node-a", "2026-10-01 00:00:00", [("s1", "success", None, "2026-10-04 10:00:00", "")]),
+        write_node(tmp_path, "node-b", "2026-10-01 00:00:05", [("s1", "failed", None, None, "")]),
+        write_node(tmp_path, "node-c", "2026-10-01 00:00:05", [("s1", "deferred", None, None, "")]),
+    ]
+    _, [report] = main.merge_node_results(paths)
+    assert report['results'][0][1] == "failed"
+
+
+def test_export_replaces_files_of_previous_runs(tmp_path, monkeypatch):
+    write_node(tmp_path, "shard0-old-node", "2026-09-30 00:00:00", [], run_id="run-1")
+    write_node(tmp_path, "shard1-other", "2026-09-30 00:00:00", [], run_id="run-1")
+    monkeypatch.setattr(main, 'SHARD_RUN_ID', "run-2")
+    monkeypatch.setattr(main, 'NODE_ID', "node-a")
+    report = {'name': "", 'success': True, 'next_run_time': None,
+              'results': [("s1", "success", None, "2026-10-04 10:00:00", "")]}
+
+    main.export_node_results([report], "2026-10-01 00:00:00", directory=str(tmp_path))
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["shard0-node-a.json", "shard1-other.json"]
+    assert json.loads((tmp_path / "shard0-node-a.json").read_text(encoding='utf-8'))['run_id'] == "run-2"
+
+
+def test_merge_without_run_id_takes_the_newest_file_per_shard(tmp_path):
+    paths = [
+        write_node(tmp_path, "shard0-old", "2026-09-30 00:00:00", [("s9", "success", None, None, "")],
+                   run_id="", shard_count=2),
+        write_node(tmp_path, "shard0-new", "2026-10-01 00:00:00", [("s1", "success", None, None, "")],
+                   run_id="", shard_count=2),
+        write_node(tmp_path, "shard1-new", "2026-10-01 00:00:03", [("s2", "failed", None, None, "")],
+                   run_id="", shard_index=1, shard_count=2),
+        # 分片数变化前留下的文件
+        write_node(tmp_path, "shard2-old", "2026-09-30 00:00:00", [("s8", "success", None, None, "")],
+                   run_id="", shard_index=2, shard_count=3),
+    ]
+    _, [report] = main.merge_node_results(paths)
+    assert sorted(result[0] for result in report['results']) == ["s1", "s2"]
+
+
+def test_export_without_run_id_replaces_the_shard_file(tmp_path, monkeypatch):
+    write_node(tmp_path, "shard0-old-node", "2026-09-30 00:00:00", [], run_id="")
+    monkeypatch.setattr(main, 'SHARD_RUN_ID', "")
+    monkeypatch.setattr(main, 'NODE_ID', "node-a")
+
+    main.export_node_results([], "2026-10-01 00:00:00", directory=str(tmp_path))
+
+    assert [path.name for path in tmp_path.iterdir()] == ["shard0-node-a.json"]
+
+
+def test_result_dict_round_trip():
+    result = ("s1", "already_extended", "2026-10-01 10:00:00", None, "one")
+    assert main.result_from_dict(main.result_to_dict(result)) == result
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+from datetime import datetime, timedelta, timezone
+
+import main
+from mock_panel import server_id_for
+
+NOW = datetime(2026, 10, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def panel_time(value):
+    return value.strftime('%Y-%m-%d %H:%M:%S')
+
+
+def make_tasks(base_url, count):
+    return [(f"{base_url}/server/{server_id_for(i)}", f"s{i}") for i in range(count)]
+
+
+def test_plan_skips_servers_outside_window_and_orders_by_expiry(mock_panel):
+    _, base_url = mock_panel
+    tasks = make_tasks(base_url, 4)
+    store = main.ServerStateStore(path="")
+    checked_at = NOW - timedelta(days=2)
+    # s0：到期时间未知；s1：远未到期；s2、s3：已进入续期窗口，s3 更早到期
+    store.record((server_id_for(1), "success", None, panel_time(NOW + timedelta(hours=100)), "s1"), checked_at)
+    store.record((server_id_for(2), "success", None, panel_time(NOW + timedelta(hours=30)), "s2"), checked_at)
+    store.record((server_id_for(3), "already_extended", panel_time(NOW + timedelta(hours=10)), None, "s3"),
+                 checked_at)
+    planner = main.RenewalPlanner(store, window_hours=48, cooldown_hours=20)
+
+    due, skipped, next_run = planner.plan(tasks, now=NOW)
+
+    assert [task[1] for _, task in due] == ["s0", "s3", "s2"]
+    assert [task[1] for _, task, _ in skipped] == ["s1"]
+    assert next_run == NOW + timedelta(hours=100 - 48)
+
+
+def test_cooldown_and_failures(mock_panel):
+    _, base_url = mock_panel
+    tasks = make_tasks(base_url, 2)
+    store = main.ServerStateStore(path="")
+    # s0 刚续期成功但到期时间仍在窗口内：冷却期内跳过；s1 上次失败：总是处理
+    store.record((server_id_for(0), "success", None, panel_time(NOW + timedelta(hours=10)), "s0"),
+                 NOW - timedelta(hours=1))
+    store.record((server_id_for(1), "failed", panel_time(NOW + timedelta(hours=100)), None, "s1"), NOW)
+    planner = main.RenewalPlanner(store, window_hours=48, cooldown_hours=20)
+
+    due, skipped, next_run = planner.plan(tasks, now=NOW)
+
+    assert [task[1] for _, task in due] == ["s1"]
+    assert next_run == NOW + timedelta(hours=19)
@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+import socket
+
+import pytest
+
+import main
+
+
+def failing(exceptions):
+    calls = []
+
+    def func():
+        calls.append(1)
+        if len(calls) <= len(exceptions):
+            raise exceptions[len(calls) - 1]
+        return "ok"
+    return func, calls
+
+
+def test_non_idempotent_calls_retry_only_connect_errors(monkeypatch):
+    monkeypatch.setattr(main.time, 'sleep', lambda seconds: None)
+    func, calls = failing([ConnectionRefusedError()])
+    assert main.with_retries("续期请求", func, retry_exceptions=main.CONNECT_ERRORS) == "ok"
+    assert len(calls) == 2
+
+    # 读取超时时请求可能已经被面板处理，不能再次提交
+    func, calls = failing([socket.timeout("timed out")])
+    with pytest.raises(socket.timeout):
+        main.with_retries("续期请求", func, retry_exceptions=main.CONNECT_ERRORS)
+    assert len(calls) == 1
+
+
+def test_retries_on_result_until_attempts_exhausted(monkeypatch):
+    monkeypatch.setattr(main.time, 'sleep', lambda seconds: None)
+    results = iter([500, 503, 200])
+    assert main.with_retries("读取", lambda: next(results), attempts=3, should_retry=lambda status: status >= 500) == 200
@@ -0,0 +1,16 @@
+# -*- coding: utf-8 -*-
+import json
+
+import main
+
+
+def test_renew_button_ignores_a_cached_loose_winner(tmp_path):
+    # 旧版本可能把宽松的候选记为续期按钮的命中项，它不能再被用于点击
+    path = tmp_path / "selectors.json"
+    path.write_text(json.dumps({'winners': {'renew_button': 'button:has-text("EXTEND")',
+                                            'expiry': 'td:has-text("Expiry")'}}), encoding='utf-8')
+
+    registry = main.SelectorRegistry(path=str(path))
+
+    assert registry.ordered('renew_button') == [main.RENEW_BUTTON_SELECTOR]
+    assert registry.ordered('expiry')[0] == 'td:has-text("Expiry")'